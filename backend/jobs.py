@@ -0,0 +1,249 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from collections import deque
+
+from gpt_researcher.utils.metrics import WorkerMetrics
+
+
+class QueueFullError(Exception):
+    """Raised when a research job is rejected because the queue is full."""
+
+
+class ResearchJob:
+    """A queued research job."""
+    def __init__(self, run, on_position=None):
+        """
+        Args:
+            run: coroutine function running the research
+            on_position: optional coroutine function notified with the job's queue position
+        """
+        self.id = uuid.uuid4().hex
+        self.run = run
+        self.on_position = on_position
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.task = None
+        self.future = asyncio.get_running_loop().create_future()
+
+    async def result(self):
+        """Waits for the job to finish and returns its result."""
+        return await asyncio.shield(self.future)
+
+
+class JobQueue:
+    """Bounded async worker pool running research jobs in arrival order."""
+    def __init__(self, max_workers=4, max_queued=32, timeout=None):
+        """
+        Args:
+            max_workers: researches running at the same time
+            max_queued: jobs allowed to wait for a worker before new ones are rejected
+            timeout: seconds a job may run before it is cancelled
+        """
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.waiting = deque()
+        self.available = asyncio.Condition()
+        self.workers = []
+        self.stats = WorkerMetrics(["completed", "failed", "timed_out", "cancelled", "rejected"])
+
+    @property
+    def running(self):
+        """Number of jobs running."""
+        return self.stats.running
+
+    def start(self):
+        """Starts the workers."""
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+
+    async def stop(self):
+        """Stops the workers, cancelling the jobs still waiting."""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        while self.waiting:
+            self.waiting.popleft().future.cancel()
+
+    async def submit(self, run, on_position=None):
+        """
+        Queues a research job
+        Args:
+            run: coroutine function running the research
+            on_position: optional coroutine function notified with the job's queue position
+
+        Returns:
+            job: ResearchJob
+        """
+        if len(self.waiting) >= self.max_queued:
+            self.stats.count("rejected")
+            raise QueueFullError("Too many research tasks are queued, please try again later.")
+        job = ResearchJob(run, on_position)
+        async with self.available:
+            self.waiting.append(job)
+            self.available.notify()
+        if self.running >= self.max_workers:
+            await self._notify_position(job, len(self.waiting))
+        return job
+
+    def cancel(self, job):
+        """Cancels a job, whether it is still waiting for a worker or already running."""
+        if job in self.waiting:
+            self.waiting.remove(job)
+            self.stats.count("cancelled")
+            job.future.cancel()
+        elif job.task is not None and not job.task.done():
+            job.task.cancel()
+
+    async def _notify_position(self, job, position):
+        if job.on_position is None:
+            return
+        try:
+            await job.on_position(position)
+        except Exception:
+            pass
+
+    async def _worker(self):
+        while True:
+            async with self.available:
+                await self.available.wait_for(lambda: self.waiting)
+                job = self.waiting.popleft()
+            for position, waiting_job in enumerate(list(self.waiting), start=1):
+                await self._notify_position(waiting_job, position)
+
+            job.started_at = time.monotonic()
+            self.stats.start(job.started_at - job.enqueued_at)
+            # The job runs in its own task so it can be cancelled without stopping the worker
+            job.task = asyncio.create_task(job.run())
+            try:
+                done, _ = await asyncio.wait({job.task}, timeout=self.timeout)
+                if not done:
+                    job.task.cancel()
+                    await asyncio.gather(job.task, return_exceptions=True)
+                    self.stats.count("timed_out")
+                    self._resolve(job, exception=asyncio.TimeoutError())
+                elif job.task.cancelled():
+                    self.stats.count("cancelled")
+                    job.future.cancel()
+                elif job.task.exception() is not None:
+                    self.stats.count("failed")
+                    self._resolve(job, exception=job.task.exception())
+                else:
+                    self.stats.count("completed")
+                    self._resolve(job, result=job.task.result())
+            except asyncio.CancelledError:
+                job.task.cancel()
+                job.future.cancel()
+                raise
+            finally:
+                job.finished_at = time.monotonic()
+                self.stats.finish(job.finished_at - job.started_at)
+
+    def _resolve(self, job, result=None, exception=None):
+        if job.future.done():
+            return
+        if exception is not None:
+            job.future.set_exception(exception)
+        else:
+            job.future.set_result(result)
+
+    def metrics(self):
+        """Returns queue depth, wait and run time metrics."""
+        return {
+            "queue_depth": len(self.waiting),
+            "max_workers": self.max_workers,
+            "max_queued": self.max_queued,
+            **self.stats.snapshot(),
+        }
+
+
+class JobRunner:
+    """
+    Claims the jobs of a shared JobStore whenever the local JobQueue has a free worker, so jobs submitted to any
+    server worker are spread over all of them. Heartbeats keep the claimed jobs leased, and the jobs of a worker that
+    died are claimed again by another one once their lease expires.
+    Store calls run in threads, so a store busy with another worker never blocks the event loop.
+    """
+    def __init__(self, store, queue, run, worker_id=None, poll_interval=0.5, lease=60):
+        """
+        Args:
+            store: JobStore
+            queue: JobQueue running the claimed jobs
+            run: coroutine function running a claimed job dict and returning its result
+            worker_id: id of this worker, host and pid by default
+            poll_interval: seconds between two claims when there is nothing to run
+            lease: seconds without heartbeat after which a claimed job is given to another worker
+        """
+        self.store = store
+        self.queue = queue
+        self.run = run
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.active = set()
+        self.writes = set()
+        self.tasks = []
+        self.stopping = False
+
+    def start(self):
+        """Starts claiming jobs."""
+        self.tasks = [asyncio.create_task(self._claim_loop()), asyncio.create_task(self._heartbeat_loop())]
+
+    async def stop(self):
+        """Stops claiming jobs. Jobs cancelled by the queue afterwards are put back for the other workers."""
+        self.stopping = True
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def drain(self):
+        """Waits for the outcomes of the finished jobs to be written to the store, e.g. after the queue stopped."""
+        # Lets the done callbacks of the jobs cancelled by the queue run first
+        await asyncio.sleep(0)
+        await asyncio.gather(*self.writes, return_exceptions=True)
+
+    def has_capacity(self):
+        return self.queue.running + len(self.queue.waiting) < self.queue.max_workers
+
+    async def _claim_loop(self):
+        while True:
+            job = None
+            if self.has_capacity():
+                job = await asyncio.to_thread(self.store.claim, self.worker_id, self.lease)
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            try:
+                queued = await self.queue.submit(lambda job=job: self.run(job))
+            except QueueFullError:
+                await asyncio.to_thread(self.store.requeue, job["id"])
+                continue
+            self.active.add(job["id"])
+            queued.future.add_done_callback(lambda future, job_id=job["id"]: self._finish(job_id, future))
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            if self.active:
+                await asyncio.to_thread(self.store.heartbeat, self.worker_id, list(self.active))
+
+    def _finish(self, job_id, future):
+        self.active.discard(job_id)
+        write = asyncio.ensure_future(asyncio.to_thread(self._record, job_id, future))
+        self.writes.add(write)
+        write.add_done_callback(self.writes.discard)
+
+    def _record(self, job_id, future):
+        if future.cancelled():
+            if self.stopping:
+                self.store.requeue(job_id)
+            else:
+                self.store.finish(job_id, "cancelled")
+        elif future.exception() is not None:
+            error = future.exception()
+            self.store.finish(job_id, "failed", error="Research timed out." if isinstance(error, asyncio.TimeoutError) else str(error))
+        else:
+            self.store.finish(job_id, "completed", result=future.result())
@@ -0,0 +1,206 @@
+import anyio
+import mimetypes
+import os
+import re
+import sqlite3
+import threading
+import time
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import Response, StreamingResponse
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class OutputsStore:
+    """Index of the report artifacts in the outputs directory, evicting them under a size and age budget.
+
+    Artifacts are named by the hash of their content, so the index only tracks sizes and access times.
+    """
+    def __init__(self, directory="outputs", index_path="outputs_index.db", max_bytes=1024 ** 3,
+                 max_age=30 * 24 * 3600, evict_interval=60):
+        """
+        Args:
+            directory: directory holding the artifacts
+            index_path: sqlite file holding the index
+            max_bytes: total size above which the least recently accessed artifacts are evicted
+            max_age: seconds without access after which an artifact is evicted
+            evict_interval: minimum seconds between two eviction passes
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evict_interval = evict_interval
+        self.last_eviction = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(index_path, check_same_thread=False)
+        # Server workers share the index
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS artifacts (name TEXT PRIMARY KEY, size INTEGER, accessed_at REAL)")
+        self.db.commit()
+
+    def sync(self):
+        """Indexes the files already in the directory and forgets the ones that disappeared."""
+        with self.lock:
+            indexed = {name for (name,) in self.db.execute("SELECT name FROM artifacts")}
+            found = set()
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if not os.path.isfile(path):
+                    continue
+                found.add(name)
+                if name not in indexed:
+                    stat = os.stat(path)
+                    self.db.execute("INSERT INTO artifacts VALUES (?, ?, ?)", (name, stat.st_size, stat.st_mtime))
+            self.db.executemany("DELETE FROM artifacts WHERE name = ?", [(name,) for name in indexed - found])
+            self.db.commit()
+
+    def record(self, name):
+        """Records a new or rewritten artifact and runs an eviction pass when one is due."""
+        path = os.path.join(self.directory, name)
+        if not os.path.isfile(path):
+            return
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?)",
+                            (name, os.path.getsize(path), time.time()))
+            self.db.commit()
+        self.evict()
+
+    def touch(self, name):
+        """Marks an artifact as accessed."""
+        with self.lock:
+            self.db.execute("UPDATE artifacts SET accessed_at = ? WHERE name = ?", (time.time(), name))
+            self.db.commit()
+
+    def evict(self, force=False):
+        """
+        Removes the artifacts not accessed within max_age, then the least recently accessed ones
+        until the total size fits max_bytes.
+
+        Returns:
+            list: The names of the removed artifacts.
+        """
+        with self.lock:
+            if not force and time.monotonic() - self.last_eviction < self.evict_interval:
+                return []
+            self.last_eviction = time.monotonic()
+            removed = [name for (name,) in self.db.execute(
+                "SELECT name FROM artifacts WHERE accessed_at < ?", (time.time() - self.max_age,))]
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts WHERE accessed_at >= ?",
+                                    (time.time() - self.max_age,)).fetchone()[0]
+            if total > self.max_bytes:
+                for name, size in self.db.execute("SELECT name, size FROM artifacts WHERE accessed_at >= ? "
+                                                  "ORDER BY accessed_at", (time.time() - self.max_age,)).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    removed.append(name)
+                    total -= size
+            self.db.executemany("DELETE FROM artifacts WHERE name = ?", [(name,) for name in removed])
+            self.db.commit()
+
+        # The files are removed without holding the index
+        for name in removed:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+        if removed:
+            print(f"Evicted {len(removed)} outputs")
+        return removed
+
+    def stats(self):
+        """Returns the number and total size of the stored artifacts."""
+        with self.lock:
+            count, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+        return {"artifacts": count, "bytes": total, "max_bytes": self.max_bytes, "max_age": self.max_age}
+
+
+def get_outputs_store() -> OutputsStore:
+    """Gets the process-wide outputs store, configured by the OUTPUTS_* environment variables."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = OutputsStore(directory=os.getenv("OUTPUTS_DIR", "outputs"),
+                                  index_path=os.getenv("OUTPUTS_INDEX_PATH", "outputs_index.db"),
+                                  max_bytes=int(os.getenv("OUTPUTS_MAX_BYTES", 1024 ** 3)),
+                                  max_age=float(os.getenv("OUTPUTS_MAX_AGE_DAYS", 30)) * 24 * 3600)
+        return _store
+
+
+def parse_range(header: str, size: int):
+    """Parses a single-range Range header.
+
+    Returns:
+        tuple: The (start, end) byte positions, None when the header should be ignored,
+        or False when the range cannot be satisfied.
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start == "":
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+async def iter_file_range(path: str, start: int, end: int, chunk_size: int = 64 * 1024):
+    async with await anyio.open_file(path, "rb") as file:
+        await file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class OutputsFiles(StaticFiles):
+    """Serves the outputs store, with Range requests, access tracking and PDFs rendered on first download."""
+    def __init__(self, store: OutputsStore, render_pdf=None, **kwargs):
+        """
+        Args:
+            store: the outputs store to serve
+            render_pdf: optional coroutine function rendering the PDF of a report path without extension
+        """
+        super().__init__(directory=store.directory, **kwargs)
+        self.store = store
+        self.render_pdf = render_pdf
+
+    async def get_response(self, path: str, scope) -> Response:
+        name = os.path.basename(path)
+        stem, extension = os.path.splitext(name)
+        if self.render_pdf is not None and name == path and extension == ".pdf" and stem.isalnum():
+            await self.render_pdf(os.path.join(self.store.directory, stem))
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 206):
+            await anyio.to_thread.run_sync(self.store.touch, name)
+        return response
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        byte_range = parse_range(request_headers.get("range", ""), stat_result.st_size)
+        if byte_range is None or status_code != 200:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            response.headers["accept-ranges"] = "bytes"
+            return response
+        if byte_range is False:
+            return Response(status_code=416, headers={"content-range": f"bytes */{stat_result.st_size}"})
+
+        start, end = byte_range
+        headers = {
+            "accept-ranges": "bytes",
+            "content-range": f"bytes {start}-{end}/{stat_result.st_size}",
+            "content-length": str(end - start + 1),
+        }
+        media_type = mimetypes.guess_type(str(full_path))[0] or "application/octet-stream"
+        if scope["method"] == "HEAD":
+            return Response(status_code=206, headers=headers, media_type=media_type)
+        return StreamingResponse(iter_file_range(str(full_path), start, end), status_code=206,
+                                 headers=headers, media_type=media_type)
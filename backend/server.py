@@ -1,13 +1,22 @@
-from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 import asyncio
 import json
 import os
-from gpt_researcher.utils.websocket_manager import WebSocketManager
+from gpt_researcher.utils.websocket_manager import WebSocketManager, run_agent
 from gpt_researcher.utils.google_sub import SubscribeManager
-from .utils import write_md_to_pdf
+from gpt_researcher.utils.http import close_http_session
+from gpt_researcher.utils.google_pub import publish_stats
+from gpt_researcher.utils.transport import close_transport
+from gpt_researcher.retrievers import get_search_cache, health_report
+from gpt_researcher.config import Config
+from .utils import ensure_pdf, shutdown_pdf_executor, write_md_to_pdf
+from .outputs import OutputsFiles, get_outputs_store
+from .jobs import JobQueue, JobRunner, QueueFullError
+from .store import JobEvents, get_job_store
 
 
 class ResearchRequest(BaseModel):
@@ -16,6 +25,11 @@ class ResearchRequest(BaseModel):
     agent: str
 
 
+class JobRequest(BaseModel):
+    task: str
+    report_type: str
+
+
 app = FastAPI()
 
 app.mount("/site", StaticFiles(directory="./frontend"), name="site")
@@ -25,24 +39,144 @@ templates = Jinja2Templates(directory="./frontend")
 
 manager = WebSocketManager()
 subscribe_manager = SubscribeManager()
+job_queue = JobQueue(max_workers=int(os.getenv("MAX_CONCURRENT_RESEARCH", 4)),
+                     max_queued=int(os.getenv("MAX_QUEUED_RESEARCH", 32)),
+                     timeout=float(os.getenv("RESEARCH_TIMEOUT", 1800)))
+# Jobs submitted over HTTP go through the store shared by all server workers, any of which may run them
+job_store = get_job_store()
+
+async def run_stored_job(job):
+    events = JobEvents(job_store, job["id"])
+    try:
+        # A job claimed again after its worker died resumes from its checkpoints
+        report = await run_agent(job["task"], job["report_type"], events, job_id=job["id"])
+        path = await write_md_to_pdf(report)
+        await events.send_json({"type": "path", "output": path})
+        return path
+    finally:
+        await events.close()
+
+job_runner = JobRunner(job_store, job_queue, run_stored_job,
+                       poll_interval=float(os.getenv("JOB_POLL_INTERVAL", 0.5)),
+                       lease=float(os.getenv("JOB_LEASE", 60)))
 async def start_pubsub_subscriber():
     await subscribe_manager.start_subscriber()
     
 # Dynamic directory for outputs once first research is run
 @app.on_event("startup")
 async def startup_event():
+    job_queue.start()
+    job_runner.start()
     await start_pubsub_subscriber()
-    if not os.path.isdir("outputs"):
-        os.makedirs("outputs")
-    app.mount("/outputs", StaticFiles(directory="outputs"), name="outputs")
+    outputs_store = get_outputs_store()
+    outputs_store.sync()
+    outputs_store.evict(force=True)
+    app.mount("/outputs", OutputsFiles(outputs_store, render_pdf=ensure_pdf), name="outputs")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_runner.stop()
+    await job_queue.stop()
+    await job_runner.drain()
+    await asyncio.to_thread(subscribe_manager.stop_subscriber)
+    await close_http_session()
+    shutdown_pdf_executor()
+    close_transport()
 
 @app.get("/")
 async def read_root(request: Request):
     return templates.TemplateResponse('index.html', {"request": request, "report": None})
 
+@app.get("/metrics/search_cache")
+async def search_cache_metrics():
+    return get_search_cache(Config().search_cache_path or None).stats()
+
+@app.get("/health/retrievers")
+async def retrievers_health():
+    return health_report()
+
+@app.get("/metrics/outputs")
+async def outputs_metrics():
+    return get_outputs_store().stats()
+
+@app.get("/metrics/jobs")
+async def job_metrics():
+    return {**job_queue.metrics(), "worker": job_runner.worker_id, "store": await asyncio.to_thread(job_store.stats)}
+
+@app.post("/jobs")
+async def submit_job(request: JobRequest):
+    return {"job_id": await asyncio.to_thread(job_store.create, request.task, request.report_type)}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request, after: int = -1):
+    """Streams the progress of a job as server-sent events, whichever worker runs it."""
+    if await asyncio.to_thread(job_store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    after = int(request.headers.get("last-event-id", after))
+
+    async def stream():
+        last_seq = after
+        while True:
+            events = await asyncio.to_thread(job_store.events, job_id, last_seq)
+            for seq, frame in events:
+                last_seq = seq
+                yield f"id: {seq}\ndata: {json.dumps(frame)}\n\n"
+            if not events:
+                job = await asyncio.to_thread(job_store.get, job_id)
+                if job["status"] in ("completed", "failed", "cancelled"):
+                    if not await asyncio.to_thread(job_store.events, job_id, last_seq):
+                        return
+                    continue
+                await asyncio.sleep(float(os.getenv("JOB_POLL_INTERVAL", 0.5)))
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+@app.get("/metrics/pubsub")
+async def pubsub_metrics():
+    return {"publisher": publish_stats(), "subscriber": subscribe_manager.metrics()}
+
+@app.get("/metrics/websockets")
+async def websocket_metrics():
+    return manager.metrics()
+
+async def run_research(task, report_type, websocket):
+    report = await manager.start_streaming(task, report_type, websocket)
+    path = await write_md_to_pdf(report)
+    await manager.send_json(websocket, {"type": "path", "output": path})
+
+async def handle_research(task, report_type, websocket):
+    async def notify_position(position):
+        await manager.send_json(websocket, {"type": "logs", "output": f"⏳ Research queued at position {position}..."})
+
+    job = None
+    try:
+        job = await job_queue.submit(lambda: run_research(task, report_type, websocket),
+                                     on_position=notify_position)
+        await job.result()
+    except QueueFullError as e:
+        await manager.send_json(websocket, {"type": "error", "output": f"Error: {e}"})
+    except asyncio.TimeoutError:
+        await manager.send_json(websocket, {"type": "error", "output": "Error: Research timed out."})
+    except asyncio.CancelledError:
+        # The client went away, stop the research instead of running it for nobody
+        if job is not None:
+            job_queue.cancel(job)
+        raise
+    except Exception as e:
+        await manager.send_json(websocket, {"type": "error", "output": f"Error: {e}"})
+
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: int):
     await manager.connect(websocket)
+    # Researches run alongside the receive loop, so a disconnect is noticed while they are running
+    researches = set()
     try:
         while True:
             data = await websocket.receive_text()
@@ -51,12 +185,13 @@ async def websocket_endpoint(websocket: WebSocket, client_id: int):
                 task = json_data.get("task")
                 report_type = json_data.get("report_type")
                 if task and report_type:
-                    report = await manager.start_streaming(task, report_type, websocket)
-                    path = await write_md_to_pdf(report)
-                    await websocket.send_json({"type": "path", "output": path})
+                    research = asyncio.create_task(handle_research(task, report_type, websocket))
+                    researches.add(research)
+                    research.add_done_callback(researches.discard)
                 else:
                     print("Error: not enough parameters provided.")
 
     except WebSocketDisconnect:
+        for research in list(researches):
+            research.cancel()
         await manager.disconnect(websocket)
-        await websocket.send_json({"type": "error", "output": 'Error: Websocket disconnected.'})
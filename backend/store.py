@@ -0,0 +1,223 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from gpt_researcher.utils.sink import MessageSink
+
+_job_store = None
+_job_store_lock = threading.Lock()
+
+
+class JobStore:
+    """Shared store of the research jobs and their progress events, so any server worker can run or serve a job."""
+    def create(self, task, report_type, job_id=None):
+        """
+        Creates a queued job
+        Args:
+            task: research task
+            report_type: report type
+            job_id: id of the job, a new one by default
+
+        Returns:
+            job_id: str
+        """
+        raise NotImplementedError
+
+    def claim(self, worker_id, lease):
+        """
+        Claims the oldest queued job, or a running job whose worker stopped sending heartbeats
+        Args:
+            worker_id: id of the claiming worker
+            lease: seconds without heartbeat after which a running job is claimed again
+
+        Returns:
+            job: dict, None when there is nothing to run
+        """
+        raise NotImplementedError
+
+    def heartbeat(self, worker_id, job_ids):
+        """Renews the lease of the jobs a worker is running."""
+        raise NotImplementedError
+
+    def finish(self, job_id, status, result=None, error=None):
+        """Records the outcome of a job: completed, failed or cancelled."""
+        raise NotImplementedError
+
+    def requeue(self, job_id):
+        """Puts a job claimed by a stopping worker back in the queue."""
+        raise NotImplementedError
+
+    def get(self, job_id):
+        """Returns a job, None when it does not exist."""
+        raise NotImplementedError
+
+    def append_event(self, job_id, frame):
+        """
+        Appends a progress frame to a job
+        Returns:
+            seq: sequence number of the frame
+        """
+        return self.append_events(job_id, [frame])[0]
+
+    def append_events(self, job_id, frames):
+        """
+        Appends several progress frames to a job at once
+        Returns:
+            seqs: sequence numbers of the frames
+        """
+        raise NotImplementedError
+
+    def events(self, job_id, after=-1, limit=500):
+        """Returns the (seq, frame) progress events of a job following sequence number after."""
+        raise NotImplementedError
+
+    def stats(self):
+        """Returns the number of jobs by status."""
+        raise NotImplementedError
+
+
+class SQLiteJobStore(JobStore):
+    """JobStore in a sqlite database in WAL mode, shared by the server workers of a host."""
+    def __init__(self, path="jobs.db"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, task TEXT, report_type TEXT, "
+                        "status TEXT, worker TEXT, result TEXT, error TEXT, attempts INTEGER DEFAULT 0, "
+                        "created_at REAL, started_at REAL, finished_at REAL, heartbeat_at REAL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS events (job_id TEXT, seq INTEGER, frame TEXT, "
+                        "PRIMARY KEY (job_id, seq))")
+
+    def _row_to_job(self, row):
+        if row is None:
+            return None
+        keys = ("id", "task", "report_type", "status", "worker", "result", "error", "attempts",
+                "created_at", "started_at", "finished_at", "heartbeat_at")
+        return dict(zip(keys, row))
+
+    def create(self, task, report_type, job_id=None):
+        job_id = job_id or uuid.uuid4().hex
+        with self.lock:
+            self.db.execute("INSERT INTO jobs (id, task, report_type, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                            (job_id, task, report_type, time.time()))
+        return job_id
+
+    def claim(self, worker_id, lease):
+        now = time.time()
+        with self.lock:
+            # An immediate transaction takes the write lock, so two workers never claim the same job
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.db.execute("SELECT * FROM jobs WHERE status = 'queued' "
+                                      "OR (status = 'running' AND heartbeat_at < ?) ORDER BY created_at LIMIT 1",
+                                      (now - lease,)).fetchone()
+                if row is not None:
+                    self.db.execute("UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ?, "
+                                    "attempts = attempts + 1 WHERE id = ?", (worker_id, now, now, row[0]))
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+        job = self._row_to_job(row)
+        if job is not None:
+            job.update(status="running", worker=worker_id, attempts=job["attempts"] + 1)
+        return job
+
+    def heartbeat(self, worker_id, job_ids):
+        with self.lock:
+            self.db.executemany("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker = ?",
+                                [(time.time(), job_id, worker_id) for job_id in job_ids])
+
+    def finish(self, job_id, status, result=None, error=None):
+        with self.lock:
+            self.db.execute("UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                            (status, result, error, time.time(), job_id))
+
+    def requeue(self, job_id):
+        with self.lock:
+            self.db.execute("UPDATE jobs SET status = 'queued', worker = NULL WHERE id = ? AND status = 'running'",
+                            (job_id,))
+
+    def get(self, job_id):
+        with self.lock:
+            return self._row_to_job(self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def append_events(self, job_id, frames):
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                last_seq = self.db.execute("SELECT COALESCE(MAX(seq), -1) FROM events WHERE job_id = ?",
+                                           (job_id,)).fetchone()[0]
+                seqs = list(range(last_seq + 1, last_seq + 1 + len(frames)))
+                self.db.executemany("INSERT INTO events VALUES (?, ?, ?)",
+                                    [(job_id, seq, json.dumps(frame)) for seq, frame in zip(seqs, frames)])
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+        return seqs
+
+    def events(self, job_id, after=-1, limit=500):
+        with self.lock:
+            rows = self.db.execute("SELECT seq, frame FROM events WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                                   (job_id, after, limit)).fetchall()
+        return [(seq, json.loads(frame)) for seq, frame in rows]
+
+    def stats(self):
+        with self.lock:
+            return dict(self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class JobEvents(MessageSink):
+    """
+    Appends the progress messages of a job to the JobStore.
+    Log and report deltas are buffered and inserted in batches from a thread, every flush_interval seconds or once
+    max_frames are buffered. Any other message type, such as "path", flushes the batch right away.
+    """
+    def __init__(self, store, job_id, flush_interval=0.25, max_frames=100):
+        self.store = store
+        self.job_id = job_id
+        self.flush_interval = flush_interval
+        self.max_frames = max_frames
+        self.frames = []
+        self.lock = asyncio.Lock()
+        self.timer = None
+
+    async def send_json(self, message):
+        self.frames.append(message)
+        if message.get("type") not in ("logs", "report", "preliminary") or len(self.frames) >= self.max_frames:
+            await self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.flush_interval,
+                                                               lambda: asyncio.ensure_future(self.flush()))
+
+    async def flush(self):
+        """Inserts the buffered frames."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        # The lock keeps the batches in order
+        async with self.lock:
+            frames, self.frames = self.frames, []
+            if frames:
+                await asyncio.to_thread(self.store.append_events, self.job_id, frames)
+
+    async def close(self):
+        """Inserts the frames still buffered."""
+        await self.flush()
+
+
+def get_job_store() -> JobStore:
+    """Gets the process-wide job store, configured by JOB_STORE_PATH."""
+    global _job_store
+    with _job_store_lock:
+        if _job_store is None:
+            _job_store = SQLiteJobStore(os.getenv("JOB_STORE_PATH", "jobs.db"))
+        return _job_store
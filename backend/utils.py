@@ -1,7 +1,20 @@
 import aiofiles
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import threading
 import urllib
-import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from md2pdf.core import md2pdf
+from .outputs import get_outputs_store
+
+_pdf_executor = None
+_pdf_renders = {}
+_pdf_lock = threading.RLock()
+
 
 async def write_to_file(filename: str, text: str) -> None:
     """Asynchronously write text to a file in UTF-8 encoding.
@@ -16,29 +29,155 @@ async def write_to_file(filename: str, text: str) -> None:
     async with aiofiles.open(filename, "w", encoding='utf-8') as file:
         await file.write(text_utf8)
 
-async def write_md_to_pdf(text: str) -> str:
-    """Converts Markdown text to a PDF file and returns the file path.
+
+async def index_output(name: str, touch: bool = False) -> None:
+    """Records a new artifact in the outputs index, or marks it as accessed, from a thread.
+
+    Index errors, e.g. the index being locked by another worker, are logged, as the artifact is already on disk.
 
     Args:
-        text (str): Markdown text to convert.
+        name (str): The artifact file name.
+        touch (bool): Whether the artifact was only accessed.
+    """
+    def update():
+        store = get_outputs_store()
+        if touch:
+            store.touch(name)
+        else:
+            store.record(name)
+
+    try:
+        await asyncio.to_thread(update)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error indexing output {name}: {e}")
+
+
+def render_pdf(md_file_path: str, pdf_file_path: str) -> None:
+    """Renders a Markdown file to PDF. Runs in the PDF process pool, or in a thread when the pool broke.
+
+    Args:
+        md_file_path (str): The Markdown file to render.
+        pdf_file_path (str): The PDF file to write.
+    """
+    # Render next to the target and rename, so a partially written PDF is never served
+    tmp_file_path = f"{pdf_file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    md2pdf(tmp_file_path,
+           md_content=None,
+           md_file_path=md_file_path,
+           css_file_path=None,
+           base_url=None)
+    os.replace(tmp_file_path, pdf_file_path)
+
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """Gets the process pool rendering the PDFs, sized by PDF_RENDER_WORKERS."""
+    global _pdf_executor
+    with _pdf_lock:
+        if _pdf_executor is None:
+            # Forking a server running gRPC, Pub/Sub and HTTP pool threads can deadlock the children, so they are spawned
+            _pdf_executor = ProcessPoolExecutor(max_workers=int(os.getenv("PDF_RENDER_WORKERS", 2)),
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _pdf_executor
+
+
+def discard_pdf_executor(executor: ProcessPoolExecutor) -> None:
+    """Drops a broken PDF process pool, so the next render starts a new one."""
+    global _pdf_executor
+    with _pdf_lock:
+        if _pdf_executor is executor:
+            _pdf_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def submit_pdf_render(md_file_path: str, pdf_file_path: str):
+    """Submits a PDF render to the process pool, replacing the pool when it broke.
 
     Returns:
-        str: The encoded file path of the generated PDF.
+        tuple: The pool and the future of the render.
+    """
+    executor = get_pdf_executor()
+    try:
+        return executor, executor.submit(render_pdf, md_file_path, pdf_file_path)
+    except BrokenProcessPool:
+        discard_pdf_executor(executor)
+        executor = get_pdf_executor()
+        return executor, executor.submit(render_pdf, md_file_path, pdf_file_path)
+
+
+def shutdown_pdf_executor() -> None:
+    """Shuts the PDF process pool down."""
+    global _pdf_executor
+    with _pdf_lock:
+        if _pdf_executor is not None:
+            _pdf_executor.shutdown(cancel_futures=True)
+            _pdf_executor = None
+
+
+async def ensure_pdf(file_path: str) -> bool:
+    """Renders the PDF of a Markdown report in the process pool, unless it was already rendered.
+
+    Concurrent requests for the same report share a single render.
+
+    Args:
+        file_path (str): The report path without extension.
+
+    Returns:
+        bool: Whether the PDF is available.
     """
-    task = uuid.uuid4().hex
-    file_path = f"outputs/{task}"
-    await write_to_file(f"{file_path}.md", text)
+    pdf_file_path = f"{file_path}.pdf"
+    if os.path.exists(pdf_file_path):
+        return True
+    if not os.path.exists(f"{file_path}.md"):
+        return False
 
+    with _pdf_lock:
+        render = _pdf_renders.get(file_path)
+        if render is None:
+            render = submit_pdf_render(f"{file_path}.md", pdf_file_path)
+            _pdf_renders[file_path] = render
+            render[1].add_done_callback(lambda _: _pdf_renders.pop(file_path, None))
+    executor, future = render
     try:
-        md2pdf(f"{file_path}.pdf",
-               md_content=None,
-               md_file_path=f"{file_path}.md",
-               css_file_path=None,
-               base_url=None)
-        print(f"Report written to {file_path}.pdf")
+        try:
+            await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # A worker crashed and broke the pool: the next renders get a new pool, this one is rendered in a thread
+            print("PDF render pool broke, rendering in a thread")
+            discard_pdf_executor(executor)
+            if not os.path.exists(pdf_file_path):
+                await asyncio.to_thread(render_pdf, f"{file_path}.md", pdf_file_path)
+        await index_output(os.path.basename(pdf_file_path))
+        print(f"Report written to {pdf_file_path}")
+        return True
     except Exception as e:
         print(f"Error in converting Markdown to PDF: {e}")
+        return False
+
+
+async def write_md_to_pdf(text: str) -> str:
+    """Writes the Markdown report and converts it to a PDF file, returning the file path.
+
+    Reports are stored in the outputs store named by the hash of their content, so identical reports are
+    stored and rendered once.
+    With PDF_RENDER_MODE=lazy the PDF is only rendered on its first download.
+
+    Args:
+        text (str): Markdown text to convert.
+
+    Returns:
+        str: The encoded file path of the generated PDF.
+    """
+    task = hashlib.sha256(text.encode('utf-8', errors='replace')).hexdigest()
+    store = await asyncio.to_thread(get_outputs_store)
+    file_path = os.path.join(store.directory, task)
+    if os.path.exists(f"{file_path}.md"):
+        await index_output(f"{task}.md", touch=True)
+    else:
+        await write_to_file(f"{file_path}.md", text)
+        await index_output(f"{task}.md")
+
+    if os.getenv("PDF_RENDER_MODE", "eager") != "lazy" and not await ensure_pdf(file_path):
         return ""
 
-    encoded_file_path = urllib.parse.quote(f"{file_path}.pdf")
+    encoded_file_path = urllib.parse.quote(f"outputs/{task}.pdf")
     return encoded_file_path
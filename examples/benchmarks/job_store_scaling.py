@@ -0,0 +1,90 @@
+"""
+Job store scaling benchmark.
+
+Runs the same batch of jobs through the shared sqlite JobStore with an increasing number of worker processes, the way
+several uvicorn workers share it. Each stubbed job burns CPU for the orchestration work of a research (parsing,
+compression, encoding), waits for its stubbed I/O and appends progress events to the store.
+
+    python -m examples.benchmarks.job_store_scaling --jobs 200 --workers 1 2 4
+"""
+import argparse
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import time
+
+from backend.jobs import JobQueue, JobRunner
+from backend.store import JobEvents, SQLiteJobStore
+
+
+def burn(seconds):
+    """Busy CPU work for the given number of seconds."""
+    deadline = time.perf_counter() + seconds
+    digest = b""
+    while time.perf_counter() < deadline:
+        digest = hashlib.sha256(digest).digest()
+
+
+async def run_worker(store_path, args):
+    store = SQLiteJobStore(store_path)
+    queue = JobQueue(max_workers=args.concurrency, max_queued=args.concurrency)
+    queue.start()
+
+    async def run(job):
+        events = JobEvents(store, job["id"])
+        for step in range(args.events):
+            burn(args.cpu_ms / 1000 / args.events)
+            await asyncio.sleep(args.io_ms / 1000 / args.events)
+            await events.send_json({"type": "logs", "output": f"Step {step} of {job['task']}"})
+        await events.close()
+        return f"outputs/{job['id']}.pdf"
+
+    runner = JobRunner(store, queue, run, poll_interval=0.05)
+    runner.start()
+    while True:
+        stats = await asyncio.to_thread(store.stats)
+        if not stats.get("queued") and not stats.get("running"):
+            break
+        await asyncio.sleep(0.1)
+    await runner.stop()
+    await queue.stop()
+    await runner.drain()
+
+
+def worker_process(store_path, args):
+    asyncio.run(run_worker(store_path, args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=4, help="jobs run at the same time by a worker")
+    parser.add_argument("--cpu-ms", type=float, default=50, help="CPU time of a job")
+    parser.add_argument("--io-ms", type=float, default=50, help="I/O wait of a job")
+    parser.add_argument("--events", type=int, default=20, help="progress events of a job")
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        store_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+        store = SQLiteJobStore(store_path)
+        for i in range(args.jobs):
+            store.create(f"Benchmark research {i}", "research_report")
+
+        start = time.perf_counter()
+        processes = [multiprocessing.Process(target=worker_process, args=(store_path, args)) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        stats = store.stats()
+        print(f"{workers} worker(s): {stats.get('completed', 0)}/{args.jobs} jobs in {elapsed:.2f}s "
+              f"({args.jobs / elapsed:.1f} jobs/s, {args.jobs * args.events / elapsed:.0f} events/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Pub/Sub research load generator.
+
+Pushes concurrent JWT-signed research tasks through the in-memory Pub/Sub transport into SubscribeManager and
+consumes the progress batches published back. The LLM, search, scraping and embeddings are stubbed with fixed
+latencies, so the run measures the messaging path and the research pipeline around them: job throughput, publish to
+ack latency and memory per concurrent job.
+
+    python -m examples.benchmarks.pubsub_load --jobs 50 --workers 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import jwt
+from langchain.embeddings.base import Embeddings
+
+
+class StubEmbeddings(Embeddings):
+    """Near-identical vectors, so every chunk passes the relevance filter."""
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [1.0] * 15 + [random.random() * 0.1]
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+class StubMemory:
+    def get_embeddings(self):
+        return StubEmbeddings()
+
+
+def install_stubs(args):
+    """Replaces the LLM, search, scraping and embeddings with stubs of fixed latency."""
+    from langchain.adapters import openai as lc_openai
+    from gpt_researcher.master import agent
+    from gpt_researcher.retrievers.base import BaseSearch
+
+    async def acreate(messages, provider="ChatOpenAI", stream=False, **kwargs):
+        if not stream:
+            await asyncio.sleep(args.llm_latency)
+            if messages[-1]["content"].startswith("task:"):
+                content = json.dumps({"server": "🔎 Research Agent", "agent_role_prompt": "You are a research assistant."})
+            else:
+                content = json.dumps([f"sub-query {i}" for i in range(3)])
+            return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+        async def chunks():
+            for i in range(args.paragraphs):
+                await asyncio.sleep(args.llm_latency / args.paragraphs)
+                yield {"choices": [{"delta": {"content": f"Paragraph {i} of the stubbed report.\n"}}]}
+        return chunks()
+
+    class StubSearch(BaseSearch):
+        async def search(self, query, max_results=7):
+            await asyncio.sleep(args.search_latency)
+            return [{"href": f"https://example.com/{query.replace(' ', '-')}/{i}", "body": query} for i in range(max_results)]
+
+    def scrape_urls(urls, cfg=None, url_index=None, cancel_event=None):
+        time.sleep(args.search_latency)
+        return [{"url": url, "raw_content": f"Content of {url}. " * 50} for url in urls]
+
+    lc_openai.ChatCompletion.acreate = staticmethod(acreate)
+    agent.build_retriever = lambda cfg: StubSearch()
+    agent.scrape_urls = scrape_urls
+    agent.Memory = StubMemory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    args = parser.parse_args()
+
+    outputs_dir = tempfile.mkdtemp()
+    os.environ.update({
+        "PUBSUB_TRANSPORT": "memory",
+        "JWT_SECRET_KEY": "load-test",
+        "PROJECT_ID": "load-test",
+        "SUB_TOPIC": "research-tasks",
+        "PUB_TOPIC": "research-progress",
+        "PUBSUB_MAX_WORKERS": str(args.workers),
+        "OUTPUTS_DIR": outputs_dir,
+        "OUTPUTS_INDEX_PATH": os.path.join(outputs_dir, "outputs_index.db"),
+        "CHECKPOINT_PATH": os.path.join(outputs_dir, "checkpoints.db"),
+        "PDF_RENDER_MODE": "lazy",
+    })
+
+    from gpt_researcher.utils.google_sub import SubscribeManager
+    from gpt_researcher.utils.transport import get_transport
+    install_stubs(args)
+
+    broker = get_transport()
+    finished = threading.Event()
+    done_jobs = set()
+    progress = {"batches": 0}
+
+    def on_progress(message):
+        batch = jwt.decode(json.loads(message.data)["message"], "load-test", algorithms="HS256")
+        progress["batches"] += 1
+        if batch.get("last"):
+            done_jobs.add(batch["job_id"])
+            if len(done_jobs) == args.jobs:
+                finished.set()
+        message.ack()
+
+    broker.subscribe("research-progress", on_progress, max_messages=1000)
+    manager = SubscribeManager()
+    asyncio.run(manager.start_subscriber())
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    for i in range(args.jobs):
+        task = jwt.encode({"task": f"Load test research {i}", "report_type": "research_report", "user_id": i}, "load-test", algorithm="HS256")
+        broker.publish("research-tasks", json.dumps({"message": task, "message_type": "research"}).encode("UTF-8"))
+    finished.wait()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    subscriber = manager.metrics()
+    manager.stop_subscriber()
+    stats = broker.stats("research-tasks")
+    print(f"jobs:             {args.jobs} in {elapsed:.2f}s ({args.jobs / elapsed:.2f} jobs/s, {args.workers} workers)")
+    print(f"progress batches: {progress['batches']} ({progress['batches'] / args.jobs:.1f} per job)")
+    print(f"ack latency:      avg {stats['ack_latency']['avg']:.3f}s, p95 {stats['ack_latency']['p95']:.3f}s")
+    print(f"job wait time:    avg {subscriber['wait_time']['avg']:.3f}s, run time avg {subscriber['run_time']['avg']:.3f}s")
+    print(f"memory:           {(peak - baseline) / 1024 / min(args.workers, args.jobs):.0f} KiB per concurrent job")
+    broker.stop()
+
+
+if __name__ == "__main__":
+    main()
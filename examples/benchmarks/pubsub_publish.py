@@ -0,0 +1,134 @@
+"""
+Pub/Sub publishing throughput benchmark.
+
+Compares publishing every message with its own client and waiting for it (the previous behaviour) with the shared,
+batching publisher of PublishManager. An in-memory stand-in for the PublisherClient simulates the latency of every
+publish RPC, so no Google Cloud project is needed.
+
+    python -m examples.benchmarks.pubsub_publish --messages 2000 --users 20 --rpc-latency 0.005
+"""
+import argparse
+import itertools
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, wait
+
+from gpt_researcher.utils.google_pub import GooglePubSubTransport, PublishManager
+
+
+class InMemoryPublisherClient:
+    """
+    Stand-in for pubsub_v1.PublisherClient batching messages like the real client.
+    Every batch costs one simulated RPC of rpc_latency seconds.
+    """
+    def __init__(self, rpc_latency=0.005, max_messages=100, max_latency=0.05):
+        self.rpc_latency = rpc_latency
+        self.max_messages = max_messages
+        self.max_latency = max_latency
+        self.batch = []
+        self.lock = threading.Lock()
+        self.rpc_lock = threading.Lock()
+        self.ids = itertools.count()
+        self.rpcs = 0
+        self.published = defaultdict(list)
+        self.delivered = defaultdict(list)
+        self.timer = None
+
+    def topic_path(self, project_id, topic):
+        return f"projects/{project_id}/topics/{topic}"
+
+    def publish(self, topic, data, ordering_key=""):
+        future = Future()
+        with self.lock:
+            self.published[ordering_key].append(data)
+            self.batch.append((future, data, ordering_key))
+            if len(self.batch) >= self.max_messages:
+                batch, self.batch = self.batch, []
+            else:
+                batch = None
+                if self.timer is None:
+                    self.timer = threading.Timer(self.max_latency, self._flush)
+                    self.timer.start()
+        if batch:
+            self._send(batch)
+        return future
+
+    def resume_publish(self, topic, ordering_key):
+        pass
+
+    def stop(self):
+        self._flush()
+
+    def _flush(self):
+        with self.lock:
+            batch, self.batch = self.batch, []
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if batch:
+            self._send(batch)
+
+    def _send(self, batch):
+        # Batches are sent one at a time, which keeps the messages of an ordering key in order
+        with self.rpc_lock:
+            time.sleep(self.rpc_latency)
+            self.rpcs += 1
+            for future, data, ordering_key in batch:
+                self.delivered[ordering_key].append(data)
+                future.set_result(str(next(self.ids)))
+
+
+def messages(count, users):
+    for i in range(count):
+        yield {"type": "logs", "output": f"🔎 Running research step {i}...", "message_type": "research", "user_id": i % users}
+
+
+def run_unbatched(args):
+    """One client per message, blocking on every publish."""
+    rpcs = 0
+    start = time.perf_counter()
+    for message in messages(args.messages, args.users):
+        client = InMemoryPublisherClient(rpc_latency=args.rpc_latency, max_messages=1)
+        PublishManager(transport=GooglePubSubTransport(publisher=client)).publish_message(message).result()
+        rpcs += client.rpcs
+    return time.perf_counter() - start, rpcs, True
+
+
+def run_batched(args):
+    """A shared batching client, publishing without waiting."""
+    client = InMemoryPublisherClient(rpc_latency=args.rpc_latency, max_messages=args.batch_size,
+                                     max_latency=args.batch_latency)
+    manager = PublishManager(transport=GooglePubSubTransport(publisher=client))
+    start = time.perf_counter()
+    futures = [manager.publish_message(message) for message in messages(args.messages, args.users)]
+    wait(futures)
+    elapsed = time.perf_counter() - start
+    client.stop()
+    # Every user must receive its messages in the order they were published
+    in_order = client.delivered == client.published
+    return elapsed, client.rpcs, in_order
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rpc-latency", type=float, default=0.005)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--batch-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+    os.environ.setdefault("PUB_TOPIC", "benchmark")
+    os.environ.setdefault("PROJECT_ID", "benchmark")
+
+    for name, run in (("unbatched", run_unbatched), ("batched", run_batched)):
+        elapsed, rpcs, in_order = run(args)
+        print(f"{name:>10}: {args.messages} messages in {elapsed:.2f}s "
+              f"({args.messages / elapsed:.0f} msg/s, {rpcs} RPCs, ordered per user: {in_order})")
+
+
+if __name__ == "__main__":
+    main()
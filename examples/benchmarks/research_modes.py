@@ -0,0 +1,65 @@
+"""
+Research mode comparison.
+
+Runs the same queries through GPTResearcher in full mode, which scrapes every search result, and in fast mode, which
+builds the context from the search snippets. The LLM, search, scraping and embeddings are stubbed with fixed
+latencies, so the run compares the latency of the research pipeline and the tokens of the context it produces.
+
+    python -m examples.benchmarks.research_modes --queries 5 --scrape-latency 2
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from examples.benchmarks.pubsub_load import install_stubs
+from gpt_researcher.utils.sink import MessageSink
+
+
+class NullLog(MessageSink):
+    async def send_json(self, message):
+        pass
+
+
+async def run_mode(mode, queries):
+    from gpt_researcher.master.agent import GPTResearcher
+
+    results = []
+    for query in queries:
+        researcher = GPTResearcher(query=query, report_type="research_report", websocket=NullLog(), research_mode=mode)
+        await researcher.run()
+        results.append(researcher.research_stats)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--scrape-latency", type=float, default=2)
+    parser.add_argument("--paragraphs", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault("CHECKPOINT_PATH", os.path.join(tempfile.mkdtemp(), "checkpoints.db"))
+    install_stubs(args)
+    from gpt_researcher.master import agent
+
+    def scrape_urls(urls, cfg=None, url_index=None, cancel_event=None):
+        time.sleep(args.scrape_latency)
+        return [{"url": url, "raw_content": f"Content of {url}. " * 500} for url in urls]
+
+    agent.scrape_urls = scrape_urls
+
+    queries = [f"Benchmark research {i}" for i in range(args.queries)]
+    for mode in ("full", "fast"):
+        results = asyncio.run(run_mode(mode, queries))
+        latency = sum(result["latency"] for result in results) / len(results)
+        tokens = sum(result["context_tokens"] or 0 for result in results) / len(results)
+        pages = sum(result["scraped_pages"] for result in results) / len(results)
+        print(f"{mode}: {latency:.2f}s per research, {tokens:.0f} context tokens, {pages:.1f} pages scraped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Batch research runner.
+
+Reads research tasks from a JSONL file, one {"task": ..., "report_type": ..., "id": ...} object per line
+(report_type defaults to research_report, id to a hash of the task and report type), and runs them concurrently.
+The researches share the process-wide HTTP pools, search cache and circuit breakers, and LLM_MAX_CONCURRENCY
+limits their LLM calls. Every finished task is appended to the output JSONL file right away. Running the same batch
+again skips the completed tasks, and interrupted tasks resume from their checkpointed stages.
+
+    python -m gpt_researcher.batch tasks.jsonl --output results.jsonl --concurrency 8
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from gpt_researcher.master.agent import GPTResearcher
+from gpt_researcher.utils.http import close_http_session
+from gpt_researcher.utils.sink import MessageSink
+
+
+class BatchLog(MessageSink):
+    """Progress sink of a batch research, printing its logs when verbose."""
+    def __init__(self, task_id, verbose=False):
+        self.task_id = task_id
+        self.verbose = verbose
+
+    async def send_json(self, message):
+        if self.verbose and message.get("type") == "logs":
+            print(f"[{self.task_id}] {message.get('output')}")
+
+
+def load_tasks(path):
+    """
+    Reads the tasks of a JSONL file
+    Args:
+        path: JSONL file
+
+    Returns:
+        tasks: list of dicts with id, task and report_type
+    """
+    tasks = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            task = entry.get("task") or entry.get("query")
+            report_type = entry.get("report_type", "research_report")
+            task_id = str(entry.get("id") or hashlib.sha1(f"{task}\n{report_type}".encode("utf-8")).hexdigest()[:16])
+            tasks.append({"id": task_id, "task": task, "report_type": report_type})
+    return tasks
+
+
+def load_completed(path):
+    """Returns the ids of the tasks already completed in an output file."""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line may be cut short by an interruption
+                continue
+            if result.get("status") == "completed":
+                completed.add(result["id"])
+    return completed
+
+
+class BatchRunner:
+    """Runs research tasks with bounded concurrency, appending their results to a JSONL file."""
+    def __init__(self, output, concurrency=4, config_path=None, verbose=False):
+        """
+        Args:
+            output: JSONL file the results are appended to
+            concurrency: researches running at the same time
+            config_path: config file of the researches (optional)
+            verbose: print the progress logs of every research
+        """
+        self.output = output
+        self.concurrency = concurrency
+        self.config_path = config_path
+        self.verbose = verbose
+        self.latencies = []
+        self.counters = {"completed": 0, "failed": 0, "skipped": 0}
+
+    def write_result(self, result):
+        with open(self.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    async def run_task(self, task, semaphore):
+        async with semaphore:
+            print(f"▶️ Starting {task['id']}: {task['task']}")
+            start = time.monotonic()
+            result = {"id": task["id"], "task": task["task"], "report_type": task["report_type"]}
+            try:
+                researcher = GPTResearcher(query=task["task"], report_type=task["report_type"],
+                                           config_path=self.config_path, websocket=BatchLog(task["id"], self.verbose),
+                                           job_id=task["id"])
+                report = await researcher.run()
+                if report.startswith("Error in generate_report:"):
+                    raise Exception(report)
+                result.update(status="completed", report=report)
+                self.counters["completed"] += 1
+            except Exception as e:
+                result.update(status="failed", error=str(e))
+                self.counters["failed"] += 1
+            result["latency"] = time.monotonic() - start
+            self.latencies.append(result["latency"])
+            self.write_result(result)
+            print(f"{'✅' if result['status'] == 'completed' else '❌'} Finished {task['id']} in {result['latency']:.1f}s")
+
+    async def run(self, tasks):
+        """
+        Runs the tasks not completed yet
+        Args:
+            tasks: list of dicts with id, task and report_type
+
+        Returns:
+            summary: dict
+        """
+        completed = load_completed(self.output)
+        pending = [task for task in tasks if task["id"] not in completed]
+        self.counters["skipped"] = len(tasks) - len(pending)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.monotonic()
+        try:
+            await asyncio.gather(*[self.run_task(task, semaphore) for task in pending])
+        finally:
+            await close_http_session()
+        return self.summary(time.monotonic() - start)
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return latencies[min(int(len(latencies) * p), len(latencies) - 1)] if latencies else None
+
+        finished = self.counters["completed"] + self.counters["failed"]
+        return {
+            **self.counters,
+            "elapsed": elapsed,
+            "tasks_per_minute": finished / elapsed * 60 if elapsed else None,
+            "latency": {"p50": percentile(0.5), "p95": percentile(0.95), "max": latencies[-1] if latencies else None},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tasks", help="JSONL file of research tasks")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL file the results are appended to")
+    parser.add_argument("--concurrency", type=int, default=4, help="researches running at the same time")
+    parser.add_argument("--config", default=None, help="config file of the researches")
+    parser.add_argument("--verbose", action="store_true", help="print the progress logs of every research")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    runner = BatchRunner(args.output, concurrency=args.concurrency, config_path=args.config, verbose=args.verbose)
+    summary = asyncio.run(runner.run(load_tasks(args.tasks)))
+
+    def seconds(value):
+        return f"{value:.1f}s" if value is not None else "-"
+
+    print(f"\n📊 {summary['completed']} completed, {summary['failed']} failed, {summary['skipped']} skipped "
+          f"in {summary['elapsed']:.1f}s ({(summary['tasks_per_minute'] or 0):.1f} tasks/min)")
+    print(f"   latency p50 {seconds(summary['latency']['p50'])}, p95 {seconds(summary['latency']['p95'])}, "
+          f"max {seconds(summary['latency']['max'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,28 @@ class Config:
         self.report_format = os.getenv('REPORT_FORMAT', "APA")
         self.max_iterations = int(os.getenv('MAX_ITERATIONS', 3))
         self.agent_role = os.getenv('AGENT_ROLE', None)
+        self.static_agent_role = os.getenv('STATIC_AGENT_ROLE', "false").lower() == "true"
+        self.parallel_planning = os.getenv('PARALLEL_PLANNING', "true").lower() == "true"
+        self.context_token_budget = int(os.getenv('CONTEXT_TOKEN_BUDGET', 12000))
+        self.max_report_sections = int(os.getenv('MAX_REPORT_SECTIONS', 5))
+        self.progressive_answer = os.getenv('PROGRESSIVE_ANSWER', "false").lower() == "true"
+        self.preliminary_token_budget = int(os.getenv('PRELIMINARY_TOKEN_BUDGET', 2000))
+        self.section_token_budget = int(os.getenv('SECTION_TOKEN_BUDGET', 4000))
+        self.research_mode = os.getenv('RESEARCH_MODE', "full")
+        self.snippet_min_relevance = float(os.getenv('SNIPPET_MIN_RELEVANCE', 0.8))
+        self.snippet_min_docs = int(os.getenv('SNIPPET_MIN_DOCS', 3))
+        self.search_hedge_results = int(os.getenv('SEARCH_HEDGE_RESULTS', 0))
+        self.search_deadline = float(os.getenv('SEARCH_DEADLINE', 8))
+        self.search_breaker_window = float(os.getenv('SEARCH_BREAKER_WINDOW', 60))
+        self.search_breaker_min_calls = int(os.getenv('SEARCH_BREAKER_MIN_CALLS', 5))
+        self.search_breaker_error_rate = float(os.getenv('SEARCH_BREAKER_ERROR_RATE', 0.5))
+        self.search_breaker_slow_call = float(os.getenv('SEARCH_BREAKER_SLOW_CALL', 10))
+        self.search_breaker_cooldown = float(os.getenv('SEARCH_BREAKER_COOLDOWN', 30))
+        self.search_cache_path = os.getenv('SEARCH_CACHE_PATH', "search_cache.db")
+        self.search_cache_ttl = int(os.getenv('SEARCH_CACHE_TTL', 86400))
+        self.search_cache_news_ttl = int(os.getenv('SEARCH_CACHE_NEWS_TTL', 900))
+        self.checkpoint_path = os.getenv('CHECKPOINT_PATH', os.path.join(
+            os.getenv('XDG_DATA_HOME', os.path.expanduser("~/.local/share")), "gpt-researcher", "checkpoints.db"))
 
         self.load_config_file()
 
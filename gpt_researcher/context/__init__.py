@@ -1,4 +1,5 @@
 from .compression import ContextCompressor
+from .packer import ContextPacker
 from .retriever import SearchAPIRetriever
 
-__all__ = ['ContextCompressor', 'SearchAPIRetriever']
+__all__ = ['ContextCompressor', 'ContextPacker', 'SearchAPIRetriever']
@@ -1,3 +1,4 @@
+import asyncio
 from .retriever import SearchAPIRetriever
 from langchain.retrievers import (
     ContextualCompressionRetriever,
@@ -7,18 +8,27 @@ from langchain.retrievers.document_compressors import (
     EmbeddingsFilter,
 )
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.utils.math import cosine_similarity
 
 
 class ContextCompressor:
-    def __init__(self, documents, embeddings, max_results=5, **kwargs):
+    def __init__(self, documents, embeddings, max_results=5, similarity_threshold=0.78, top_k=20, vectors=None, **kwargs):
         self.max_results = max_results
+        # Embeddings of chunks by content: reused instead of embedding a chunk again, and filled with the relevant ones
+        self.vectors = vectors
         self.documents = documents
         self.kwargs = kwargs
         self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.top_k = top_k
+
+    def _get_splitter(self):
+        return RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
 
     def _get_contextual_retriever(self):
-        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-        relevance_filter = EmbeddingsFilter(embeddings=self.embeddings, similarity_threshold=0.78)
+        splitter = self._get_splitter()
+        relevance_filter = EmbeddingsFilter(embeddings=self.embeddings, similarity_threshold=self.similarity_threshold,
+                                            k=self.top_k)
         pipeline_compressor = DocumentCompressorPipeline(
             transformers=[splitter, relevance_filter]
         )
@@ -30,13 +40,58 @@ class ContextCompressor:
         )
         return contextual_retriever
 
-    def _pretty_print_docs(self, docs, top_n):
+    @staticmethod
+    def pretty_print_docs(docs, top_n=None):
         return f"\n".join(f"Source: {d.metadata.get('source')}\n"
                           f"Title: {d.metadata.get('title')}\n"
                           f"Content: {d.page_content}\n"
-                          for i, d in enumerate(docs) if i < top_n)
+                          for i, d in enumerate(docs) if top_n is None or i < top_n)
+
+    def _pretty_print_docs(self, docs, top_n):
+        return self.pretty_print_docs(docs, top_n)
+
+    async def aget_relevant_documents(self, query):
+        """
+        Async counterpart of the contextual retriever pipeline.
+        Splits the pages into chunks and embeds the query and the chunks concurrently through the
+        embeddings' native async API, so the event loop is never blocked and the call can be cancelled
+        at any await point (e.g. when the client disconnects).
+        Args:
+            query: query to rank the chunks against
+
+        Returns:
+            docs: relevant chunks sorted by similarity, with their score in metadata["relevance_score"]
+        """
+        docs = self._get_splitter().split_documents(SearchAPIRetriever(pages=self.documents).get_relevant_documents(query))
+        if not docs:
+            return []
+
+        vectors = self.vectors if self.vectors is not None else {}
+        missing = list(dict.fromkeys(doc.page_content for doc in docs if doc.page_content not in vectors))
+        embedded_query, embedded_missing = await asyncio.gather(
+            self.embeddings.aembed_query(query),
+            self.embeddings.aembed_documents(missing) if missing else asyncio.sleep(0, [])
+        )
+        new_vectors = dict(zip(missing, embedded_missing))
+        embedded_docs = [vectors[doc.page_content] if doc.page_content in vectors else new_vectors[doc.page_content]
+                         for doc in docs]
+        similarity = cosine_similarity([embedded_query], embedded_docs)[0]
+        ranked_idxs = sorted(range(len(docs)), key=lambda i: similarity[i], reverse=True)[:self.top_k]
+
+        relevant_docs = []
+        for i in ranked_idxs:
+            if similarity[i] > self.similarity_threshold:
+                docs[i].metadata["relevance_score"] = float(similarity[i])
+                relevant_docs.append(docs[i])
+                if self.vectors is not None:
+                    self.vectors[docs[i].page_content] = embedded_docs[i]
+        return relevant_docs
 
     def get_context(self, query, max_results=5):
         compressed_docs = self._get_contextual_retriever()
         relevant_docs = compressed_docs.get_relevant_documents(query)
-        return self._pretty_print_docs(relevant_docs, max_results)
\ No newline at end of file
+        return self._pretty_print_docs(relevant_docs, max_results)
+
+    async def aget_context(self, query, max_results=5):
+        relevant_docs = await self.aget_relevant_documents(query)
+        return self._pretty_print_docs(relevant_docs, max_results)
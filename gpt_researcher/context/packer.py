@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import re
+from functools import lru_cache
+
+import tiktoken
+
+from .compression import ContextCompressor
+
+
+class ApproximateEncoding:
+    """Counts about one token per 4 characters, when no tiktoken encoding can be loaded."""
+    chars_per_token = 4
+
+    def encode(self, text, **kwargs):
+        return [text[i:i + self.chars_per_token] for i in range(0, len(text), self.chars_per_token)]
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model):
+    """
+    Gets the tokenizer of the given model, falling back to cl100k_base for unknown models, and to an approximate
+    counter when the encoding cannot be loaded (tiktoken downloads it on first use)
+    Args:
+        model: model name
+
+    Returns:
+        encoding: tiktoken encoding or ApproximateEncoding
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"⚠️ Could not load the tokenizer of {model}, approximating token counts: {e}")
+        return ApproximateEncoding()
+
+
+async def aget_encoding(model):
+    """Gets the tokenizer of the given model without blocking the event loop on its first load."""
+    return await asyncio.to_thread(get_encoding, model)
+
+
+class ContextPacker:
+    """
+    Packs the relevant chunks of every sub-query into a token budget before the report is written.
+    Chunks repeated across sub-queries are kept once (with their best relevance score) and the
+    highest-relevance chunks are selected until the budget of the target model is filled.
+    """
+    def __init__(self, model, token_budget, encoding=None):
+        """
+        Args:
+            model: model the context is packed for
+            token_budget: max tokens of the packed context
+            encoding: tokenizer of the model, loaded with get_encoding by default
+        """
+        self.encoding = encoding or get_encoding(model)
+        self.token_budget = token_budget
+        self.packed_docs = []
+
+    def count_tokens(self, text):
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    @staticmethod
+    def _chunk_key(doc):
+        normalized = re.sub(r"\s+", " ", doc.page_content).strip().lower()
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+    def pack(self, docs_per_query):
+        """
+        Dedups and packs the chunks of all sub-queries into the token budget, keeping the packed chunks in packed_docs
+        Args:
+            docs_per_query: list with the relevant documents of each sub-query
+
+        Returns:
+            context: packed context string
+            stats: dict with the token counts of the raw and packed context
+        """
+        raw_context = "\n".join(ContextCompressor.pretty_print_docs(docs) for docs in docs_per_query)
+
+        unique_docs = {}
+        for docs in docs_per_query:
+            for doc in docs:
+                key = self._chunk_key(doc)
+                score = doc.metadata.get("relevance_score", 0)
+                if key not in unique_docs or score > unique_docs[key].metadata.get("relevance_score", 0):
+                    unique_docs[key] = doc
+
+        ranked_docs = sorted(unique_docs.values(), key=lambda d: d.metadata.get("relevance_score", 0), reverse=True)
+        packed, used_tokens = [], 0
+        self.packed_docs = []
+        for doc in ranked_docs:
+            text = ContextCompressor.pretty_print_docs([doc])
+            tokens = self.count_tokens(text)
+            if used_tokens + tokens > self.token_budget:
+                continue
+            packed.append(text)
+            self.packed_docs.append(doc)
+            used_tokens += tokens
+
+        context = "\n".join(packed)
+        raw_tokens = self.count_tokens(raw_context)
+        packed_tokens = self.count_tokens(context)
+        stats = {
+            "chunks": sum(len(docs) for docs in docs_per_query),
+            "unique_chunks": len(unique_docs),
+            "packed_chunks": len(packed),
+            "raw_tokens": raw_tokens,
+            "packed_tokens": packed_tokens,
+            "saved_tokens": raw_tokens - packed_tokens,
+        }
+        return context, stats
@@ -1,15 +1,23 @@
+import asyncio
+import threading
 import time
 from gpt_researcher.config import Config
 from gpt_researcher.master.functions import *
 from gpt_researcher.context.compression import ContextCompressor
+from gpt_researcher.context.packer import ContextPacker, aget_encoding
 from gpt_researcher.memory import Memory
+from gpt_researcher.utils.checkpoint import get_checkpoint_store
+from gpt_researcher.utils.urls import URLIndex
+from langchain.schema import Document
+from langchain.utils.math import cosine_similarity
 
 
 class GPTResearcher:
     """
     GPT Researcher
     """
-    def __init__(self, query, report_type, source_urls=None, config_path=None, websocket=None, message_type=None, user_id=None):
+    def __init__(self, query, report_type, source_urls=None, config_path=None, websocket=None, message_type=None, user_id=None, job_id=None,
+                 research_mode=None):
         """
         Initialize the GPT Researcher class.
         Args:
@@ -17,6 +25,10 @@ class GPTResearcher:
             report_type:
             config_path:
             websocket:
+            job_id: id under which the completed stages are checkpointed, so running the job again resumes
+                from the last completed stage (optional)
+            research_mode: "full" scrapes every search result, "fast" builds the context from the search snippets
+                and only scrapes the sub-queries whose snippets are not relevant enough (defaults to RESEARCH_MODE)
         """
         self.query = query
         self.agent = None
@@ -24,13 +36,63 @@ class GPTResearcher:
         self.report_type = report_type
         self.websocket = websocket
         self.cfg = Config(config_path)
-        self.retriever = get_retriever(self.cfg.retriever)
+        # Built on the first search, so researches of source_urls never need a search provider
+        self._retriever = None
         self.context = []
+        self.context_stats = {}
+        self.context_docs = []
+        # Embeddings of the relevant chunks by content, so report sections are ranked without embedding them again
+        self.chunk_vectors = {}
+        self.research_mode = research_mode or self.cfg.research_mode
+        self.research_stats = {"snippet_sub_queries": 0, "scraped_sub_queries": 0, "scraped_pages": 0}
         self.source_urls = source_urls
         self.memory = Memory()
-        self.visited_urls = set()
+        self.visited_urls = URLIndex()
+        # Set when the research is cancelled, stopping the scraper threads that are still running
+        self.cancel_event = threading.Event()
+        self.preliminary_task = None
         self.message_type = message_type
         self.user_id = user_id
+        self.job_id = job_id
+        # Opened when the research starts, as opening the store blocks on sqlite
+        self.checkpoints = None
+
+    @property
+    def retriever(self):
+        """Search retriever, built on first use."""
+        if self._retriever is None:
+            self._retriever = build_retriever(self.cfg)
+        return self._retriever
+
+    async def open_checkpoints(self):
+        """Opens the checkpoint store of the job, dropping its checkpoints when they are of another query."""
+        if self.job_id is None or self.checkpoints is not None:
+            return
+
+        def open_store():
+            checkpoints = get_checkpoint_store(self.cfg.checkpoint_path)
+            if checkpoints.load(self.job_id, "query") != self.query:
+                # The checkpoints of another query cannot be reused
+                checkpoints.clear(self.job_id)
+                checkpoints.save(self.job_id, "query", self.query)
+            return checkpoints
+
+        self.checkpoints = await asyncio.to_thread(open_store)
+
+    async def load_checkpoint(self, stage):
+        """
+        Loads the checkpoint of a completed stage of the job
+        Returns:
+            data: None when the stage was not completed yet or the research is not checkpointed
+        """
+        if self.checkpoints is None:
+            return None
+        return await asyncio.to_thread(self.checkpoints.load, self.job_id, stage)
+
+    async def save_checkpoint(self, stage, data):
+        """Saves the output of a completed stage of the job."""
+        if self.checkpoints is not None:
+            await asyncio.to_thread(self.checkpoints.save, self.job_id, stage, data)
 
     async def run(self, message_type=None, user_id=None):
         """
@@ -38,27 +100,179 @@ class GPTResearcher:
         Returns:
             Report
         """
+        try:
+            return await self.conduct_research()
+        except asyncio.CancelledError:
+            print(f"🛑 Research for '{self.query}' was cancelled")
+            self.cancel_event.set()
+            raise
+        finally:
+            if self.preliminary_task is not None:
+                self.preliminary_task.cancel()
+
+    async def conduct_research(self):
+        """
+        Conducts the research and writes the report
+        Returns:
+            Report
+        """
         print(f"🔎 Running research for '{self.query}'...")
-        # Generate Agent
-        self.agent, self.role = await choose_agent(self.query, self.cfg, self.message_type, self.user_id)
+        self.started_at = time.monotonic()
+        await self.open_checkpoints()
+        report = await self.load_checkpoint(f"report:{self.report_type}")
+        if report is not None:
+            await stream_output("logs", f"♻️ Reusing the {self.report_type} of job {self.job_id}", self.websocket, self.message_type, self.user_id)
+            await stream_output("report", report, self.websocket, self.message_type, self.user_id)
+            return report
+
+        # Plan the research: choose the agent and generate the sub-queries
+        context = await self.load_checkpoint("context")
+        self.agent, self.role, sub_queries = await self.plan_research(need_sub_queries=context is None and not self.source_urls)
         await stream_output("logs", self.agent, self.websocket, self.message_type, self.user_id)
+        await stream_output("logs", f"🧭 Planned the research in {time.monotonic() - self.started_at:.2f}s",
+                            self.websocket, self.message_type, self.user_id)
 
+        if context is not None:
+            # Only the report is left to write, e.g. when the job is run again with another report type
+            self.context, self.context_stats = context[:2]
+            # Contexts checkpointed without their chunks are used whole by every section of a detailed report
+            self.context_docs = [Document(page_content=doc["page_content"], metadata=doc["metadata"])
+                                 for doc in (context[2] if len(context) > 2 else [])]
+            await stream_output("logs", f"♻️ Resumed the research context of job {self.job_id}", self.websocket, self.message_type, self.user_id)
         # If specified, the researcher will use the given urls as the context for the research.
-        if self.source_urls:
+        elif self.source_urls:
             self.context = await self.get_context_by_urls(self.source_urls)
+            await self.save_context_checkpoint()
         else:
-            self.context = await self.get_context_by_search(self.query)
+            self.context = await self.get_context_by_search(self.query, sub_queries)
+            await self.save_context_checkpoint()
 
-        # Write Research Report
+        if self.visited_urls.avoided_fetches:
+            await stream_output("logs", f"♻️ Skipped {self.visited_urls.avoided_fetches} duplicate url fetches", self.websocket, self.message_type, self.user_id)
+
+        # Write Research Report, which replaces the preliminary answer
+        await self.stop_preliminary_answer()
         if self.report_type == "custom_report":
             self.role = self.cfg.agent_role if self.cfg.agent_role else self.role
         await stream_output("logs", f"✍️ Writing {self.report_type} for research task: {self.query}...", self.websocket, self.message_type, self.user_id)
-        report = await generate_report(query=self.query, context=self.context,
-                                       agent_role_prompt=self.role, report_type=self.report_type,
-                                       websocket=self.websocket, cfg=self.cfg, message_type=self.message_type, user_id=self.user_id)
-        time.sleep(2)
+        if self.report_type == "detailed_report":
+            report = await self.write_detailed_report()
+        else:
+            report = await generate_report(query=self.query, context=self.context,
+                                           agent_role_prompt=self.role, report_type=self.report_type,
+                                           websocket=self.websocket, cfg=self.cfg, message_type=self.message_type, user_id=self.user_id)
+        if not report.startswith("Error in generate_report:"):
+            await self.save_checkpoint(f"report:{self.report_type}", report)
+        self.research_stats.update(mode=self.research_mode, latency=time.monotonic() - self.started_at,
+                                   context_tokens=self.context_stats.get("packed_tokens"))
+        await stream_output("logs",
+                            f"🏁 Finished the {self.research_mode} research in {self.research_stats['latency']:.2f}s: "
+                            f"{self.research_stats['context_tokens']} context tokens, "
+                            f"{self.research_stats['scraped_pages']} pages scraped, "
+                            f"{self.research_stats['snippet_sub_queries']} sub-queries answered from snippets",
+                            self.websocket, self.message_type, self.user_id)
+        await asyncio.sleep(2)
         return report
 
+    async def save_context_checkpoint(self):
+        """Saves the packed context, its stats and the packed chunks."""
+        await self.save_checkpoint("context", [self.context, self.context_stats,
+                                         [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in self.context_docs]])
+
+    async def write_detailed_report(self):
+        """
+        Outlines the report sections, then writes them concurrently, each from the context relevant to it
+        Returns:
+            report: the sections and the references, falling back to a research_report when the outline fails
+        """
+        sections = await generate_report_sections(self.query, self.context, self.role, self.cfg, self.message_type, self.user_id)
+        if not sections:
+            return await generate_report(query=self.query, context=self.context,
+                                         agent_role_prompt=self.role, report_type="research_report",
+                                         websocket=self.websocket, cfg=self.cfg, message_type=self.message_type, user_id=self.user_id)
+        await stream_output("logs", f"📑 Writing {len(sections)} sections: {[section['title'] for section in sections]}",
+                            self.websocket, self.message_type, self.user_id)
+        section_contexts = await self.get_section_contexts(sections)
+        report = await generate_detailed_report(self.query, sections, section_contexts, self.role, self.websocket, self.cfg,
+                                                self.message_type, self.user_id)
+        sources = list(dict.fromkeys(doc.metadata.get("source") for doc in self.context_docs if doc.metadata.get("source")))
+        if sources and not report.startswith("Error in generate_report:"):
+            references = "## References\n\n" + "\n".join(f"- {source}" for source in sources)
+            await stream_output("report", references, self.websocket, self.message_type, self.user_id, logging=False)
+            report += "\n\n" + references
+        return report
+
+    async def get_section_contexts(self, sections):
+        """
+        Packs the context relevant to each report section into the section token budget
+        Args:
+            sections: list of {"title", "points"} dicts
+
+        Returns:
+            contexts: context of each section, the whole context when its chunks are not known
+        """
+        if not self.context_docs:
+            return [self.context] * len(sections)
+        embeddings = self.memory.get_embeddings()
+        # Only the chunks restored from a checkpoint were not embedded during the research
+        missing = list(dict.fromkeys(doc.page_content for doc in self.context_docs if doc.page_content not in self.chunk_vectors))
+        embedded_sections, embedded_missing = await asyncio.gather(
+            embeddings.aembed_documents([f"{section['title']}: {', '.join(section.get('points', []))}" for section in sections]),
+            embeddings.aembed_documents(missing) if missing else asyncio.sleep(0, [])
+        )
+        self.chunk_vectors.update(zip(missing, embedded_missing))
+        embedded_docs = [self.chunk_vectors[doc.page_content] for doc in self.context_docs]
+        packer = ContextPacker(model=self.cfg.smart_llm_model, token_budget=self.cfg.section_token_budget,
+                               encoding=await aget_encoding(self.cfg.smart_llm_model))
+        contexts = []
+        for similarity in cosine_similarity(embedded_sections, embedded_docs):
+            docs = [Document(page_content=doc.page_content, metadata={**doc.metadata, "relevance_score": float(score)})
+                    for doc, score in zip(self.context_docs, similarity)]
+            context, _ = packer.pack([docs])
+            contexts.append(context)
+        return contexts
+
+    def uses_static_role(self):
+        """Whether the configured agent role is used as is, skipping agent selection."""
+        return bool(self.cfg.agent_role) and (self.cfg.static_agent_role or self.report_type == "custom_report")
+
+    async def plan_research(self, need_sub_queries=True):
+        """
+        Chooses the agent and generates the sub-queries.
+        The two LLM calls run concurrently when parallel planning is enabled, the sub-queries being generated with
+        the default role instead of the chosen one. With a static role, agent selection is skipped entirely.
+        Args:
+            need_sub_queries: whether the research needs sub-queries
+
+        Returns:
+            agent: agent name
+            role: agent role prompt
+            sub_queries: list of sub-queries including the query, None when not needed
+        """
+        agent = await self.load_checkpoint("agent")
+        if agent is None and self.uses_static_role():
+            agent = ["Custom Agent", self.cfg.agent_role]
+        sub_queries = await self.load_checkpoint("sub_queries") if need_sub_queries else None
+
+        async def choose():
+            agent = list(await choose_agent(self.query, self.cfg, self.message_type, self.user_id))
+            await self.save_checkpoint("agent", agent)
+            return agent
+
+        async def generate_sub_queries(role):
+            sub_queries = await get_sub_queries(self.query, role, self.cfg, self.message_type, self.user_id) + [self.query]
+            await self.save_checkpoint("sub_queries", sub_queries)
+            return sub_queries
+
+        if agent is None and need_sub_queries and sub_queries is None and self.cfg.parallel_planning:
+            agent, sub_queries = await asyncio.gather(choose(), generate_sub_queries(DEFAULT_AGENT_ROLE))
+        else:
+            if agent is None:
+                agent = await choose()
+            if need_sub_queries and sub_queries is None:
+                sub_queries = await generate_sub_queries(agent[1])
+        return agent[0], agent[1], sub_queries
+
     async def get_context_by_urls(self, urls):
         """
             Scrapes and compresses the context from the given urls
@@ -67,31 +281,137 @@ class GPTResearcher:
         await stream_output("logs",
                             f"🧠 I will conduct my research based on the following urls: {new_search_urls}...",
                             self.websocket, self.message_type, self.user_id)
-        scraped_sites = scrape_urls(new_search_urls, self.cfg)
-        return await self.get_similar_content_by_query(self.query, scraped_sites)
+        scraped_sites = await asyncio.to_thread(scrape_urls, new_search_urls, self.cfg, self.visited_urls, self.cancel_event)
+        relevant_docs = await self.get_similar_docs_by_query(self.query, scraped_sites)
+        return await self.pack_context([relevant_docs])
 
-    async def get_context_by_search(self, query):
+    async def get_context_by_search(self, query, sub_queries=None):
         """
            Generates the context for the research task by searching the query and scraping the results
+        Args:
+            query:
+            sub_queries: planned sub-queries including the query (optional)
+
         Returns:
-            context: List of context
+            context: Packed context of all sub-queries
         """
-        context = []
         # Generate Sub-Queries including original query
-        sub_queries = await get_sub_queries(query, self.role, self.cfg, self.message_type, self.user_id) + [query]
+        if sub_queries is None:
+            sub_queries = await get_sub_queries(query, self.role, self.cfg, self.message_type, self.user_id) + [query]
         await stream_output("logs",
                             f"🧠 I will conduct my research based on the following queries: {sub_queries}...",
                             self.websocket, self.message_type, self.user_id)
 
-        # Run Sub-Queries
-        for sub_query in sub_queries:
-            await stream_output("logs", f"\n🔎 Running research for '{sub_query}'...", self.websocket, self.message_type, self.user_id)
-            scraped_sites = await self.scrape_sites_by_query(sub_query)
-            content = await self.get_similar_content_by_query(sub_query, scraped_sites)
-            await stream_output("logs", f"📃 {content}", self.websocket, self.message_type, self.user_id)
-            context.append(content)
+        # Sub-queries completed before the job was interrupted are not searched and scraped again
+        docs_per_query = {}
+        checkpoints = await asyncio.gather(*[self.load_checkpoint(f"docs:{sub_query}") for sub_query in sub_queries])
+        for sub_query, docs in zip(sub_queries, checkpoints):
+            if docs is not None:
+                docs_per_query[sub_query] = [Document(page_content=doc["page_content"], metadata=doc["metadata"]) for doc in docs]
+        # A page yields several chunks, its url is marked as visited once
+        restored_sources = {doc.metadata.get("source") for docs in docs_per_query.values() for doc in docs}
+        for source in filter(None, restored_sources):
+            self.visited_urls.add(source)
+        pending = [sub_query for sub_query in sub_queries if sub_query not in docs_per_query]
+        if len(pending) < len(sub_queries):
+            await stream_output("logs", f"♻️ Resumed {len(sub_queries) - len(pending)} completed sub-queries of job {self.job_id}",
+                                self.websocket, self.message_type, self.user_id)
+            self.start_preliminary_answer(list(docs_per_query.values()))
 
-        return context
+        # Search all Sub-Queries at once, then scrape and compress them concurrently
+        if pending:
+            await stream_output("logs", f"⏱️ Time to first search: {time.monotonic() - self.started_at:.2f}s",
+                                self.websocket, self.message_type, self.user_id)
+        search_results = await self.retriever.search_many(pending, max_results=self.cfg.max_search_results_per_query) if pending else []
+        pending_docs = await asyncio.gather(*[self.process_sub_query(sub_query, results)
+                                              for sub_query, results in zip(pending, search_results)])
+        docs_per_query.update(zip(pending, pending_docs))
+        return await self.pack_context([docs_per_query[sub_query] for sub_query in sub_queries])
+
+    async def process_sub_query(self, sub_query, search_results=None):
+        """
+        Searches, scrapes and compresses the context for a single sub-query
+        Args:
+            sub_query:
+            search_results: results of the sub-query when it was already searched (optional)
+
+        Returns:
+            docs: relevant documents for the sub-query
+        """
+        await stream_output("logs", f"\n🔎 Running research for '{sub_query}'...", self.websocket, self.message_type, self.user_id)
+        if search_results is None:
+            search_results = await self.retriever.search(sub_query, max_results=self.cfg.max_search_results_per_query)
+        relevant_docs = None
+        if self.research_mode == "fast":
+            relevant_docs = await self.get_docs_from_snippets(sub_query, search_results)
+        if relevant_docs is None:
+            scraped_sites = await self.scrape_sites_by_query(sub_query, search_results)
+            relevant_docs = await self.get_similar_docs_by_query(sub_query, scraped_sites)
+            self.research_stats["scraped_sub_queries"] += 1
+        await self.save_checkpoint(f"docs:{sub_query}", [{"page_content": doc.page_content, "metadata": doc.metadata}
+                                                         for doc in relevant_docs])
+        content = ContextCompressor.pretty_print_docs(relevant_docs)
+        await stream_output("logs", f"📃 {content}", self.websocket, self.message_type, self.user_id)
+        self.start_preliminary_answer([relevant_docs])
+        return relevant_docs
+
+    def start_preliminary_answer(self, docs_per_query):
+        """
+        Starts writing the preliminary answer from the first relevant documents found, in progressive mode
+        Args:
+            docs_per_query: list with the relevant documents of the sub-queries completed so far
+        """
+        if not self.cfg.progressive_answer or self.preliminary_task is not None or not any(docs_per_query):
+            return
+        self.preliminary_task = asyncio.create_task(self.write_preliminary_answer(docs_per_query))
+
+    async def write_preliminary_answer(self, docs_per_query):
+        """Streams a short answer from the fast model while the remaining sub-queries run."""
+        packer = ContextPacker(model=self.cfg.fast_llm_model, token_budget=self.cfg.preliminary_token_budget,
+                               encoding=await aget_encoding(self.cfg.fast_llm_model))
+        context, _ = packer.pack(docs_per_query)
+        sink = PreliminarySink(self.websocket, self.message_type, self.user_id)
+        try:
+            await generate_preliminary_answer(self.query, context, self.role, sink, self.cfg)
+        except Exception as e:
+            print(f"{Fore.RED}Error in generate_preliminary_answer: {e}{Style.RESET_ALL}")
+            return
+        if sink.first_chunk_at is not None:
+            self.research_stats["time_to_first_content"] = sink.first_chunk_at - self.started_at
+            await stream_output("logs", f"💡 Preliminary answer started after {self.research_stats['time_to_first_content']:.2f}s",
+                                self.websocket, self.message_type, self.user_id)
+
+    async def stop_preliminary_answer(self):
+        """Cancels the preliminary answer when it is still being written, as the report replaces it."""
+        if self.preliminary_task is not None and not self.preliminary_task.done():
+            self.preliminary_task.cancel()
+            try:
+                await self.preliminary_task
+            except asyncio.CancelledError:
+                pass
+
+    async def get_docs_from_snippets(self, sub_query, search_results):
+        """
+        Gets the relevant documents of a sub-query from the snippets of its search results, without scraping
+        Args:
+            sub_query:
+            search_results: results of the sub-query
+
+        Returns:
+            docs: relevant snippets, None when fewer than snippet_min_docs of them reach snippet_min_relevance
+        """
+        pages = [{"url": result.get("href"), "raw_content": result.get("body"), "title": result.get("title", "")}
+                 for result in search_results or [] if result.get("body")]
+        relevant_docs = await self.get_similar_docs_by_query(sub_query, pages)
+        covered = [doc for doc in relevant_docs if doc.metadata.get("relevance_score", 0) >= self.cfg.snippet_min_relevance]
+        if len(covered) < self.cfg.snippet_min_docs:
+            await stream_output("logs", f"🌐 Only {len(covered)} relevant snippets for '{sub_query}', scraping its results...",
+                                self.websocket, self.message_type, self.user_id)
+            return None
+        self.research_stats["snippet_sub_queries"] += 1
+        await stream_output("logs", f"⚡ Using {len(relevant_docs)} search snippets for '{sub_query}'",
+                            self.websocket, self.message_type, self.user_id)
+        return relevant_docs
 
     async def get_new_urls(self, url_set_input):
         """ Gets the new urls from the given url set.
@@ -101,38 +421,65 @@ class GPTResearcher:
 
         new_urls = []
         for url in url_set_input:
-            if url not in self.visited_urls:
+            if url and self.visited_urls.add(url):
                 await stream_output("logs", f"✅ Adding source url to research: {url}\n", self.websocket, self.message_type, self.user_id)
-
-                self.visited_urls.add(url)
                 new_urls.append(url)
 
         return new_urls
 
-    async def scrape_sites_by_query(self, sub_query):
+    async def scrape_sites_by_query(self, sub_query, search_results=None):
         """
         Runs a sub-query
         Args:
             sub_query:
+            search_results: results of the sub-query when it was already searched (optional)
 
         Returns:
             Summary
         """
         # Get Urls
-        retriever = self.retriever(sub_query)
-        search_results = retriever.search(max_results=self.cfg.max_search_results_per_query)
-        new_search_urls = await self.get_new_urls([url.get("href") for url in search_results])
+        if search_results is None:
+            search_results = await self.retriever.search(sub_query, max_results=self.cfg.max_search_results_per_query)
+        new_search_urls = await self.get_new_urls([url.get("href") for url in search_results or []])
 
         # Scrape Urls
         # await stream_output("logs", f"📝Scraping urls {new_search_urls}...\n", self.websocket)
         await stream_output("logs", f"🤔Researching for relevant information...\n", self.websocket, self.message_type, self.user_id)
-        scraped_content_results = scrape_urls(new_search_urls, self.cfg)
+        scraped_content_results = await asyncio.to_thread(scrape_urls, new_search_urls, self.cfg, self.visited_urls, self.cancel_event)
+        self.research_stats["scraped_pages"] += len(scraped_content_results)
         return scraped_content_results
 
-    async def get_similar_content_by_query(self, query, pages):
+    async def get_similar_docs_by_query(self, query, pages, max_results=8):
         await stream_output("logs", f"📃 Getting relevant content based on query: {query}...", self.websocket, self.message_type, self.user_id)
         # Summarize Raw Data
-        context_compressor = ContextCompressor(documents=pages, embeddings=self.memory.get_embeddings())
+        context_compressor = ContextCompressor(documents=pages, embeddings=self.memory.get_embeddings(),
+                                               vectors=self.chunk_vectors)
         # Run Tasks
-        return context_compressor.get_context(query, max_results=8)
+        relevant_docs = await context_compressor.aget_relevant_documents(query)
+        return relevant_docs[:max_results]
+
+    async def get_similar_content_by_query(self, query, pages):
+        relevant_docs = await self.get_similar_docs_by_query(query, pages)
+        return ContextCompressor.pretty_print_docs(relevant_docs)
+
+    async def pack_context(self, docs_per_query):
+        """
+        Dedups the relevant chunks of all sub-queries and packs them into the configured token budget
+        Args:
+            docs_per_query: list with the relevant documents of each sub-query
+
+        Returns:
+            context: packed context string
+        """
+        packer = ContextPacker(model=self.cfg.smart_llm_model, token_budget=self.cfg.context_token_budget,
+                               encoding=await aget_encoding(self.cfg.smart_llm_model))
+        context, stats = packer.pack(docs_per_query)
+        self.context_stats = stats
+        self.context_docs = packer.packed_docs
+        await stream_output("logs",
+                            f"🗜️ Packed {stats['packed_chunks']}/{stats['unique_chunks']} unique chunks "
+                            f"({stats['chunks'] - stats['unique_chunks']} duplicates) into {stats['packed_tokens']} tokens, "
+                            f"saved {stats['saved_tokens']} tokens",
+                            self.websocket, self.message_type, self.user_id)
+        return context
 
@@ -1,10 +1,14 @@
 import asyncio
+import time
 from gpt_researcher.utils.llm import *
 from gpt_researcher.scraper import Scraper
 from gpt_researcher.master.prompts import *
 from gpt_researcher.utils.google_pub import PublishManager
+from gpt_researcher.utils.sink import MessageSink
 import json
 
+DEFAULT_AGENT_ROLE = "You are an AI critical thinker research assistant. Your sole purpose is to write well written, critically acclaimed, objective and structured reports on given text."
+
 
 def get_retriever(retriever):
     """
@@ -42,6 +46,9 @@ def get_retriever(retriever):
         case "BingSearch":
             from gpt_researcher.retrievers import BingSearch
             retriever = BingSearch
+        case "local":
+            from gpt_researcher.retrievers import LocalSearch
+            retriever = LocalSearch
 
         case _:
             raise Exception("Retriever not found.")
@@ -49,6 +56,55 @@ def get_retriever(retriever):
     return retriever
 
 
+def get_search_cache_ttl(retriever, cfg):
+    """
+    Gets how long the results of a retriever stay fresh in the search cache
+    Args:
+        retriever: retriever name
+        cfg: Config
+
+    Returns:
+        ttl: seconds
+    """
+    if retriever == "tavily_news":
+        return cfg.search_cache_news_ttl
+    # Local corpus searches are cheap and must reflect re-indexed files
+    if retriever == "local":
+        return 0
+    return cfg.search_cache_ttl
+
+
+def build_retriever(cfg):
+    """
+    Builds the retriever instance used for a research.
+    Every backend is guarded by its process-wide circuit breaker (Tavily falls back to DuckDuckGo while its
+    breaker is open or a call fails) and wrapped with the process-wide search cache, which skips fallback results.
+    Several comma-separated retrievers (e.g. "tavily,duckduckgo") are queried concurrently through CompositeSearch.
+    Args:
+        cfg: Config
+
+    Returns:
+        retriever: retriever instance
+    """
+    from gpt_researcher.retrievers import CachedRetriever, CompositeSearch, GuardedRetriever, get_breaker, get_search_cache
+
+    retrievers = {}
+    for name in [name.strip() for name in cfg.retriever.split(",") if name.strip()]:
+        breaker = get_breaker(name, window=cfg.search_breaker_window, min_calls=cfg.search_breaker_min_calls,
+                              error_rate=cfg.search_breaker_error_rate, slow_call=cfg.search_breaker_slow_call,
+                              cooldown=cfg.search_breaker_cooldown)
+        fallback = get_retriever("duckduckgo")() if name == "tavily" else None
+        retriever = GuardedRetriever(get_retriever(name)(), breaker, fallback=fallback)
+        ttl = get_search_cache_ttl(name, cfg)
+        if ttl > 0:
+            retriever = CachedRetriever(retriever, name, get_search_cache(cfg.search_cache_path or None), ttl)
+        retrievers[name] = retriever
+
+    if len(retrievers) == 1:
+        return next(iter(retrievers.values()))
+    return CompositeSearch(retrievers, min_results=cfg.search_hedge_results, deadline=cfg.search_deadline)
+
+
 async def choose_agent(query, cfg, message_type=None, user_id=None):
     """
     Chooses the agent automatically
@@ -74,7 +130,7 @@ async def choose_agent(query, cfg, message_type=None, user_id=None):
         agent_dict = json.loads(response)
         return agent_dict["server"], agent_dict["agent_role_prompt"]
     except Exception as e:
-        return "Default Agent", "You are an AI critical thinker research assistant. Your sole purpose is to write well written, critically acclaimed, objective and structured reports on given text."
+        return "Default Agent", DEFAULT_AGENT_ROLE
 
 
 async def get_sub_queries(query, agent_role_prompt, cfg, message_type=None, user_id=None):
@@ -104,12 +160,14 @@ async def get_sub_queries(query, agent_role_prompt, cfg, message_type=None, user
     return sub_queries
 
 
-def scrape_urls(urls, cfg=None):
+def scrape_urls(urls, cfg=None, url_index=None, cancel_event=None):
     """
     Scrapes the urls
     Args:
         urls: List of urls
         cfg: Config (optional)
+        url_index: URLIndex used to skip pages that redirect to an already visited url (optional)
+        cancel_event: threading.Event stopping the remaining fetches once set (optional)
 
     Returns:
         text: str
@@ -118,7 +176,7 @@ def scrape_urls(urls, cfg=None):
     content = []
     user_agent = cfg.user_agent if cfg else "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36 Edg/119.0.0.0"
     try:
-        content = Scraper(urls, user_agent).run()
+        content = Scraper(urls, user_agent, url_index=url_index, cancel_event=cancel_event).run()
     except Exception as e:
         print(f"{Fore.RED}Error in scrape_urls: {e}{Style.RESET_ALL}")
     return content
@@ -240,6 +298,191 @@ async def generate_report(query, context, agent_role_prompt, report_type, websoc
 
 
 
+class PreliminarySink(MessageSink):
+    """Sends the report chunks of a stream as preliminary answer chunks."""
+    def __init__(self, websocket=None, message_type=None, user_id=None):
+        self.websocket = websocket
+        self.message_type = message_type
+        self.user_id = user_id
+        self.sent = ""
+        self.first_chunk_at = None
+
+    async def send_json(self, message):
+        if message.get("type") != "report":
+            return await stream_output(message["type"], message["output"], self.websocket, self.message_type, self.user_id)
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.monotonic()
+        self.sent += message["output"]
+        await stream_output("preliminary", message["output"], self.websocket, self.message_type, self.user_id, logging=False)
+
+
+async def generate_preliminary_answer(query, context, agent_role_prompt, sink, cfg):
+    """
+    Streams a short preliminary answer from the fast model, as "preliminary" messages that the report replaces
+    Args:
+        query:
+        context: context found so far
+        agent_role_prompt:
+        sink: PreliminarySink
+        cfg:
+
+    Returns:
+        answer:
+
+    """
+    answer = await create_chat_completion(
+        model=cfg.fast_llm_model,
+        messages=[
+            {"role": "system", "content": f"{agent_role_prompt}"},
+            {"role": "user", "content": generate_preliminary_answer_prompt(query, context)}],
+        temperature=0,
+        llm_provider=cfg.llm_provider,
+        stream=True,
+        websocket=sink,
+        message_type=sink.message_type,
+        user_id=sink.user_id
+    )
+    # The last paragraph of a stream is only sent once it ends with a newline
+    if answer[len(sink.sent):]:
+        await sink.send_json({"type": "report", "output": answer[len(sink.sent):]})
+    return answer
+
+
+async def generate_report_sections(query, context, agent_role_prompt, cfg, message_type=None, user_id=None):
+    """
+    Outlines the sections of a detailed report
+    Args:
+        query:
+        context:
+        agent_role_prompt:
+        cfg:
+
+    Returns:
+        sections: list of {"title", "points"} dicts, empty when the outline could not be generated
+
+    """
+    try:
+        response = await create_chat_completion(
+            model=cfg.smart_llm_model,
+            messages=[
+                {"role": "system", "content": f"{agent_role_prompt}"},
+                {"role": "user", "content": generate_report_sections_prompt(query, context, cfg.max_report_sections)}],
+            temperature=0,
+            llm_provider=cfg.llm_provider,
+            message_type=message_type,
+            user_id=user_id
+        )
+        sections = [section for section in json.loads(response) if section.get("title")]
+        return sections[:cfg.max_report_sections]
+    except Exception as e:
+        print(f"{Fore.RED}Error in generate_report_sections: {e}{Style.RESET_ALL}")
+        return []
+
+
+class OrderedReportStream:
+    """
+    Streams the sections of a report written concurrently in their order.
+    The first unfinished section streams live, the following ones are buffered until the sections before them are done.
+    """
+    def __init__(self, sections_count, websocket=None, message_type=None, user_id=None):
+        self.buffers = [[] for _ in range(sections_count)]
+        self.done = [False] * sections_count
+        self.current = 0
+        self.websocket = websocket
+        self.message_type = message_type
+        self.user_id = user_id
+        self.lock = asyncio.Lock()
+
+    def section(self, index):
+        """Returns the websocket-like sink of a section."""
+        return SectionSink(self, index)
+
+    async def emit(self, message):
+        await stream_output(message["type"], message["output"], self.websocket, self.message_type, self.user_id, logging=False)
+
+    async def send(self, index, message):
+        async with self.lock:
+            if index == self.current:
+                await self.emit(message)
+            else:
+                self.buffers[index].append(message)
+
+    async def finish(self, index):
+        """Marks a section as written, flushing the buffered sections that follow it."""
+        async with self.lock:
+            self.done[index] = True
+            while self.current < len(self.done) and self.done[self.current]:
+                self.current += 1
+                if self.current < len(self.done):
+                    for message in self.buffers[self.current]:
+                        await self.emit(message)
+                    self.buffers[self.current] = []
+
+
+class SectionSink(MessageSink):
+    """Output of one section of an OrderedReportStream."""
+    def __init__(self, stream, index):
+        self.stream = stream
+        self.index = index
+        self.sent = ""
+
+    async def send_json(self, message):
+        if message.get("type") == "report":
+            self.sent += message["output"]
+        await self.stream.send(self.index, message)
+
+
+async def generate_detailed_report(query, sections, section_contexts, agent_role_prompt, websocket, cfg, message_type=None, user_id=None):
+    """
+    Writes the sections of a detailed report concurrently, streaming them in order
+    Args:
+        query:
+        sections: list of {"title", "points"} dicts
+        section_contexts: context relevant to each section
+        agent_role_prompt:
+        websocket:
+        cfg:
+
+    Returns:
+        report:
+
+    """
+    titles = [section["title"] for section in sections]
+    words_per_section = max(cfg.total_words // len(sections), 250)
+    stream = OrderedReportStream(len(sections), websocket, message_type, user_id)
+
+    async def write_section(index, section):
+        sink = stream.section(index)
+        try:
+            text = await create_chat_completion(
+                model=cfg.smart_llm_model,
+                messages=[
+                    {"role": "system", "content": f"{agent_role_prompt}"},
+                    {"role": "user", "content": generate_report_section_prompt(query, section, titles, section_contexts[index],
+                                                                               cfg.report_format, words_per_section)}],
+                temperature=0,
+                llm_provider=cfg.llm_provider,
+                stream=True,
+                websocket=sink,
+                message_type=message_type,
+                user_id=user_id
+            )
+            # The last paragraph of a stream is only sent once it ends with a newline
+            await sink.send_json({"type": "report", "output": text[len(sink.sent):] + "\n\n"})
+            return text.strip()
+        finally:
+            await stream.finish(index)
+
+    tasks = [asyncio.create_task(write_section(index, section)) for index, section in enumerate(sections)]
+    try:
+        return "\n\n".join(await asyncio.gather(*tasks))
+    except Exception as e:
+        for task in tasks:
+            task.cancel()
+        print(f"{Fore.RED}Error in generate_report: {e}{Style.RESET_ALL}")
+        return f"Error in generate_report: {e}{Style.RESET_ALL}"
+
+
 async def stream_output(type, output, websocket=None, message_type=None, user_id=None, logging=True):
     """
     Streams output to the websocket
@@ -74,6 +74,54 @@ def generate_outline_report_prompt(question, context, report_format="apa", total
            ' Use appropriate Markdown syntax to format the outline and ensure readability.'
 
 
+def generate_preliminary_answer_prompt(question, context):
+    """ Generates the prompt of the preliminary answer given while the research continues.
+    Args: question (str): The question to answer
+            context (str): The context found so far
+    Returns: str: The preliminary answer prompt
+    """
+
+    return f'Information: """{context}"""\n\n' \
+           f'Using the above information, give a short preliminary answer to the following query or task: "{question}".' \
+           ' The answer should be at most 150 words in markdown syntax, state the key facts and numbers first,' \
+           ' and mention what is still uncertain. The research is still running, so do NOT write a full report.'
+
+
+def generate_report_sections_prompt(question, context, max_sections=5):
+    """ Generates the prompt of the section outline of a detailed report.
+    Args: question (str): The question the report answers
+            context (str): The research context
+            max_sections (int): The max number of sections
+    Returns: str: The section outline prompt
+    """
+
+    return f'"""{context}""" Using the above information, outline a detailed research report in at most {max_sections} sections' \
+           f' for the following question or topic: "{question}". The sections should not overlap and together answer the question' \
+           ' in depth, from an introduction to a conclusion.\n' \
+           'You must respond with a list of JSON objects in the following format: ' \
+           '[{"title": "section title", "points": ["key point 1", "key point 2"]}].'
+
+
+def generate_report_section_prompt(question, section, outline, context, report_format="apa", total_words=1000):
+    """ Generates the prompt of one section of a detailed report.
+    Args: question (str): The question the report answers
+            section (dict): The section to write, with its title and key points
+            outline (list[str]): The titles of all sections of the report
+            context (str): The research context relevant to the section
+    Returns: str: The section prompt
+    """
+
+    return f'Information: """{context}"""\n\n' \
+           f'Using the above information, write the section "{section["title"]}" of a detailed report on the following' \
+           f' query or task: "{question}". The report has the following sections: {outline}.\n' \
+           f'The section must cover the following key points: {section.get("points", [])}, with facts and numbers if' \
+           f' available and a minimum of {total_words} words. Do not cover the topics of the other sections.\n' \
+           f'You must write the section with markdown syntax, starting with the heading "## {section["title"]}".\n' \
+           "Use an unbiased and journalistic tone. Do NOT write an introduction or a conclusion to the section unless it is its topic.\n" \
+           f"You MUST write the section in {report_format} format, citing the source urls of the information using inline notations.\n" \
+           f"Assume that the current date is {datetime.now().strftime('%B %d, %Y')}"
+
+
 def get_report_by_type(report_type):
     report_type_mapping = {
         'research_report': generate_report_prompt,
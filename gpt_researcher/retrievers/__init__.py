@@ -6,6 +6,10 @@ from .serper.serper import SerperSearch
 from .serpapi.serpapi import SerpApiSearch
 from .searx.searx import SearxSearch
 from .bing.bing import BingSearch
+from .local.local import LocalSearch
+from .composite.composite import CompositeSearch
+from .cache import CachedRetriever, SearchCache, get_search_cache
+from .health import CircuitBreaker, CircuitOpenError, GuardedRetriever, get_breaker, health_report
 
 __all__ = [
     "TavilySearch",
@@ -15,5 +19,15 @@ __all__ = [
     "SerpApiSearch",
     "GoogleSearch",
     "SearxSearch",
-    "BingSearch"
+    "BingSearch",
+    "LocalSearch",
+    "CompositeSearch",
+    "CachedRetriever",
+    "SearchCache",
+    "get_search_cache",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "GuardedRetriever",
+    "get_breaker",
+    "health_report"
 ]
@@ -0,0 +1,43 @@
+# Base Search Retriever
+
+# libraries
+import asyncio
+
+
+class FallbackResults(list):
+    """Search results served by a fallback retriever instead of the requested one, which must not be cached as its own."""
+
+
+class BaseSearch():
+    """
+    Base class of the search retrievers
+    Retrievers implement `search` and may override `search_many` with a native batch endpoint.
+    """
+    max_concurrent_searches = 8
+
+    async def search(self, query, max_results=7):
+        """
+        Searches the query
+        Returns:
+            results: list of {"href", "body"[, "title"]} dicts
+        """
+        raise NotImplementedError
+
+    async def search_many(self, queries, max_results=7):
+        """
+        Searches several queries at once.
+        Without a batch endpoint, the search calls are pipelined concurrently over the shared HTTP pool.
+        Args:
+            queries: list of queries
+            max_results: max results per query
+
+        Returns:
+            results: list of search results, in the order of the queries
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_searches)
+
+        async def search_one(query):
+            async with semaphore:
+                return await self.search(query, max_results=max_results)
+
+        return list(await asyncio.gather(*[search_one(query) for query in queries]))
@@ -2,21 +2,19 @@
 
 # libraries
 import os
-import requests
 import json
+from gpt_researcher.utils.http import get_http_session
+from gpt_researcher.retrievers.base import BaseSearch
 
 
-class BingSearch():
+class BingSearch(BaseSearch):
     """
     Bing Search Retriever
     """
-    def __init__(self, query):
+    def __init__(self):
         """
         Initializes the BingSearch object
-        Args:
-            query:
         """
-        self.query = query
         self.api_key = self.get_api_key()
 
     def get_api_key(self):
@@ -31,13 +29,13 @@ class BingSearch():
             raise Exception("Bing API key not found. Please set the BING_API_KEY environment variable.")
         return api_key
 
-    def search(self, max_results=7):
+    async def search(self, query, max_results=7):
         """
         Searches the query
         Returns:
 
         """
-        print("Searching with query {0}...".format(self.query))
+        print("Searching with query {0}...".format(query))
         """Useful for general internet search queries using the Bing API."""
 
 
@@ -50,21 +48,20 @@ class BingSearch():
         }
         params = {
             "responseFilter" : "Webpages",
-            "q": self.query,
+            "q": query,
             "count": max_results,
             "setLang": "en-GB",
-            "textDecorations": False,
+            "textDecorations": "false",
             "textFormat": "HTML",
             "safeSearch": "Strict"
         }
         
-        resp = requests.get(url, headers=headers, params=params)
+        async with get_http_session().get(url, headers=headers, params=params) as resp:
+            text = await resp.text()
 
         # Preprocess the results
-        if resp is None:
-            return
         try:
-            search_results = json.loads(resp.text)
+            search_results = json.loads(text)
         except Exception:
             return
         if search_results is None:
@@ -0,0 +1,239 @@
+# Search result cache shared by all retrievers
+
+# libraries
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from gpt_researcher.retrievers.base import BaseSearch, FallbackResults
+
+
+def normalize_query(query):
+    """
+    Normalizes a search query so that trivially different variants share a cache entry
+    Args:
+        query: search query
+
+    Returns:
+        normalized query: case-folded, whitespace-collapsed and stripped of surrounding quotes/punctuation
+    """
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = re.sub(r"\s+", " ", query)
+    return query.strip(" \"'.,;:!?")
+
+
+class SearchCache:
+    """
+    Two-level (in-memory LRU + sqlite) cache of search results with per-entry expiry.
+    Its methods block on sqlite, so async code calls them through asyncio.to_thread. A sqlite error, e.g. the file
+    being locked by another process for longer than the busy timeout, is a cache miss on get and skips the write on set.
+    """
+    def __init__(self, path=None, max_memory_entries=2048):
+        """
+        Initializes the SearchCache object
+        Args:
+            path: sqlite file for the persistent level, or None to keep the cache in memory only
+            max_memory_entries: size of the in-memory LRU level
+        """
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        # Serializes the sqlite connection, so memory hits never wait for the disk
+        self.db_lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self.db = None
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                self.db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+                # Several server workers share the file: readers do not wait for a writer
+                self.db.execute("PRAGMA journal_mode=WAL")
+                self.db.execute("CREATE TABLE IF NOT EXISTS search_cache "
+                                "(key TEXT PRIMARY KEY, retriever TEXT, expires_at REAL, results TEXT)")
+                self.db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Search cache {path} unavailable, caching in memory only: {e}")
+                self.db = None
+
+    @staticmethod
+    def make_key(retriever, query, max_results):
+        raw = f"{retriever}\x00{normalize_query(query)}\x00{max_results}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Gets the cached results for a key
+        Returns:
+            results: the cached search results, or None when missing or expired
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None and entry[0] > now:
+                self.memory.move_to_end(key)
+                self.hits["memory"] += 1
+                return entry[1]
+            self.memory.pop(key, None)
+
+        row = None
+        if self.db is not None:
+            try:
+                with self.db_lock:
+                    row = self.db.execute("SELECT expires_at, results FROM search_cache WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                print(f"⚠️ Search cache read failed: {e}")
+        with self.lock:
+            if row is not None and row[0] > now:
+                results = json.loads(row[1])
+                self._remember(key, row[0], results)
+                self.hits["disk"] += 1
+                return results
+            self.misses += 1
+            return None
+
+    def get_many(self, keys):
+        """
+        Gets the cached results for several keys
+        Returns:
+            results: dict of the cached search results by key, None for the missing or expired ones
+        """
+        return {key: self.get(key) for key in keys}
+
+    def set(self, key, retriever, results, ttl):
+        """
+        Stores the results for a key for ttl seconds
+        """
+        self.set_many({key: results}, retriever, ttl)
+
+    def set_many(self, results, retriever, ttl):
+        """
+        Stores the results of several keys for ttl seconds, in a single transaction
+        Args:
+            results: dict of search results by key
+            retriever: retriever name
+            ttl: seconds the results stay fresh
+        """
+        expires_at = time.time() + ttl
+        with self.lock:
+            for key, key_results in results.items():
+                self._remember(key, expires_at, key_results)
+        if self.db is None:
+            return
+        try:
+            with self.db_lock:
+                with self.db:
+                    self.db.executemany("INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?)",
+                                        [(key, retriever, expires_at, json.dumps(key_results))
+                                         for key, key_results in results.items()])
+                    self.db.execute("DELETE FROM search_cache WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            print(f"⚠️ Search cache write failed: {e}")
+
+    def _remember(self, key, expires_at, results):
+        self.memory[key] = (expires_at, results)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def stats(self):
+        """
+        Returns the hit-rate metrics of the cache
+        """
+        with self.lock:
+            hits = self.hits["memory"] + self.hits["disk"]
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.hits["memory"],
+                "disk_hits": self.hits["disk"],
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self.memory),
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_search_cache(path=None):
+    """
+    Gets the process-wide search cache for the given sqlite path
+    """
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = SearchCache(path)
+        return _caches[path]
+
+
+class CachedRetriever(BaseSearch):
+    """
+    Wraps a retriever instance with the search cache.
+    Concurrent identical searches on the same event loop share a single upstream request.
+    FallbackResults of a guarded retriever are not cached, as they do not come from this retriever.
+    """
+    def __init__(self, retriever, name, cache, ttl):
+        """
+        Initializes the CachedRetriever object
+        Args:
+            retriever: retriever instance to wrap
+            name: retriever name, part of the cache key
+            cache: SearchCache
+            ttl: seconds the results of this retriever stay fresh
+        """
+        self.retriever = retriever
+        self.name = name
+        self.cache = cache
+        self.ttl = ttl
+        self.inflight = {}
+
+    async def search(self, query, max_results=7):
+        """
+        Searches the query, serving it from the cache when possible
+        Returns:
+
+        """
+        key = self.cache.make_key(self.name, query, max_results)
+        results = await asyncio.to_thread(self.cache.get, key)
+        if results is not None:
+            return results
+
+        if key in self.inflight:
+            return await asyncio.shield(self.inflight[key])
+
+        task = asyncio.ensure_future(self.retriever.search(query, max_results=max_results))
+        self.inflight[key] = task
+        try:
+            results = await task
+        finally:
+            self.inflight.pop(key, None)
+        # Empty results usually mean a failed request, so they are not cached
+        if results and not isinstance(results, FallbackResults):
+            await asyncio.to_thread(self.cache.set, key, self.name, results, self.ttl)
+        return results
+
+    async def search_many(self, queries, max_results=7):
+        """
+        Searches several queries, sending only the cache misses (once per normalized query) to the retriever
+        Returns:
+            results: list of search results, in the order of the queries
+        """
+        keys = [self.cache.make_key(self.name, query, max_results) for query in queries]
+        results = await asyncio.to_thread(self.cache.get_many, set(keys))
+        missing = {key: query for key, query in zip(keys, queries) if results[key] is None}
+        if missing:
+            fetched = await self.retriever.search_many(list(missing.values()), max_results=max_results)
+            results.update(zip(missing, fetched))
+            fresh = {key: results[key] for key in missing
+                     if results[key] and not isinstance(results[key], FallbackResults)}
+            if fresh:
+                await asyncio.to_thread(self.cache.set_many, fresh, self.name, self.ttl)
+        return [results[key] for key in keys]
@@ -0,0 +1,96 @@
+# Composite Retriever
+
+# libraries
+import asyncio
+import time
+from colorama import Fore, Style
+from gpt_researcher.retrievers.health import CircuitOpenError
+from gpt_researcher.utils.urls import canonicalize_url
+from gpt_researcher.retrievers.base import BaseSearch
+
+
+class CompositeSearch(BaseSearch):
+    """
+    Composite Retriever
+    Queries several retrievers concurrently and merges their results with reciprocal rank fusion.
+    Searches are hedged: the call returns as soon as enough unique results arrived or the deadline passed,
+    cancelling the slower backends.
+    """
+    def __init__(self, retrievers, min_results=0, deadline=None, rrf_k=60):
+        """
+        Initializes the CompositeSearch object
+        Args:
+            retrievers: dict of retriever name -> retriever instance
+            min_results: return once this many unique results arrived (0 waits for every backend)
+            deadline: seconds after which the call returns with whatever results arrived, possibly none
+            rrf_k: reciprocal rank fusion constant
+        """
+        self.retrievers = retrievers
+        self.min_results = min_results
+        self.deadline = deadline
+        self.rrf_k = rrf_k
+
+    @staticmethod
+    def _url_key(href):
+        return canonicalize_url(href)
+
+    def fuse(self, ranked_lists):
+        """
+        Merges ranked result lists with reciprocal rank fusion, deduplicating by URL
+        Args:
+            ranked_lists: list of result lists, each ordered by relevance
+
+        Returns:
+            results: fused results ordered by score
+        """
+        scores, merged = {}, {}
+        for results in ranked_lists:
+            for rank, result in enumerate(results):
+                href = result.get("href")
+                if not href:
+                    continue
+                key = self._url_key(href)
+                scores[key] = scores.get(key, 0) + 1 / (self.rrf_k + rank + 1)
+                # Keep the richest snippet reported for the url
+                if key not in merged or len(result.get("body") or "") > len(merged[key].get("body") or ""):
+                    merged[key] = result
+        return [merged[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+    async def _search_one(self, name, retriever, query, max_results):
+        try:
+            return await retriever.search(query, max_results=max_results) or []
+        except CircuitOpenError:
+            return []
+        except Exception as e:
+            print(f"{Fore.RED}Error in {name} search: {e}{Style.RESET_ALL}")
+            return []
+
+    async def search(self, query, max_results=7):
+        """
+        Searches the query on every retriever
+        Returns:
+
+        """
+        pending = {asyncio.ensure_future(self._search_one(name, retriever, query, max_results))
+                   for name, retriever in self.retrievers.items()}
+        end_time = time.monotonic() + self.deadline if self.deadline else None
+        ranked_lists, unique_urls = [], set()
+        try:
+            while pending:
+                timeout = max(end_time - time.monotonic(), 0) if end_time else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    results = task.result()
+                    ranked_lists.append(results)
+                    unique_urls.update(self._url_key(r["href"]) for r in results if r.get("href"))
+
+                if self.min_results and len(unique_urls) >= self.min_results:
+                    break
+                # The deadline is hard: past it, the results that arrived are returned, even none
+                if end_time is not None and time.monotonic() >= end_time:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return self.fuse(ranked_lists)[:max_results]
@@ -1,21 +1,17 @@
-from itertools import islice
-from duckduckgo_search import DDGS
+from duckduckgo_search import AsyncDDGS
+from gpt_researcher.retrievers.base import BaseSearch
 
 
-class Duckduckgo:
+class Duckduckgo(BaseSearch):
     """
     Duckduckgo API Retriever
     """
-    def __init__(self, query):
-        self.ddg = DDGS()
-        self.query = query
-
-    def search(self, max_results=5):
+    async def search(self, query, max_results=5):
         """
         Performs the search
         :param query:
         :param max_results:
         :return:
         """
-        ddgs_gen = self.ddg.text(self.query, region='wt-wt', max_results=max_results)
-        return ddgs_gen
\ No newline at end of file
+        async with AsyncDDGS() as ddgs:
+            return [r async for r in ddgs.text(query, region='wt-wt', max_results=max_results)]
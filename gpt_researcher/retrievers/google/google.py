@@ -1,30 +1,26 @@
-# Tavily API Retriever
+# Google API Retriever
 
 # libraries
 import os
-import requests
 import json
-from tavily import TavilyClient
+from gpt_researcher.utils.http import get_http_session
+from gpt_researcher.retrievers.base import BaseSearch
 
 
-class GoogleSearch:
+class GoogleSearch(BaseSearch):
     """
-    Tavily API Retriever
+    Google API Retriever
     """
-    def __init__(self, query):
+    def __init__(self):
         """
-        Initializes the TavilySearch object
-        Args:
-            query:
+        Initializes the GoogleSearch object
         """
-        self.query = query
         self.api_key = self.get_api_key() #GOOGLE_API_KEY
         self.cx_key = self.get_cx_key() #GOOGLE_CX_KEY
-        self.client = TavilyClient(self.api_key)
 
     def get_api_key(self):
         """
-        Gets the Tavily API key
+        Gets the Google API key
         Returns:
 
         """
@@ -38,7 +34,7 @@ class GoogleSearch:
 
     def get_cx_key(self):
         """
-        Gets the Tavily API key
+        Gets the Google CX key
         Returns:
 
         """
@@ -50,21 +46,21 @@ class GoogleSearch:
                             "You can get a key at https://developers.google.com/custom-search/v1/overview")
         return api_key
 
-    def search(self, max_results=7):
+    async def search(self, query, max_results=7):
         """
         Searches the query
         Returns:
 
         """
         """Useful for general internet search queries using the Google API."""
-        print("Searching with query {0}...".format(self.query))
-        url = f"https://www.googleapis.com/customsearch/v1?key={self.api_key}&cx={self.cx_key}&q={self.query}&start=1"
-        resp = requests.get(url)
+        print("Searching with query {0}...".format(query))
+        url = "https://www.googleapis.com/customsearch/v1"
+        params = {"key": self.api_key, "cx": self.cx_key, "q": query, "start": 1}
+        async with get_http_session().get(url, params=params) as resp:
+            text = await resp.text()
 
-        if resp is None:
-            return
         try:
-            search_results = json.loads(resp.text)
+            search_results = json.loads(text)
         except Exception:
             return
         if search_results is None:
@@ -0,0 +1,235 @@
+# Circuit breakers and health scoring for search backends
+
+# libraries
+import asyncio
+import threading
+import time
+from collections import deque
+from colorama import Fore, Style
+from gpt_researcher.retrievers.base import BaseSearch, FallbackResults
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a search backend is skipped because its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker over a rolling window of call outcomes and latencies.
+    The breaker opens when the share of failed or slow calls in the window crosses the threshold,
+    rejects calls while open, and lets a single probe through after the cooldown (half-open)
+    to decide whether to close again.
+    """
+    def __init__(self, name, window=60, min_calls=5, error_rate=0.5, slow_call=10, cooldown=30):
+        """
+        Initializes the CircuitBreaker object
+        Args:
+            name: backend name
+            window: seconds of history used for the error rate and latency stats
+            min_calls: calls needed in the window before the breaker may open
+            error_rate: share of failed or slow calls that opens the breaker
+            slow_call: seconds after which a successful call still counts against the backend
+            cooldown: seconds the breaker stays open before probing the backend again
+        """
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.opened_at = None
+        self.probing = False
+        self.calls = deque()
+        self.lock = threading.Lock()
+
+    def _trim(self, now):
+        while self.calls and self.calls[0][0] < now - self.window:
+            self.calls.popleft()
+
+    def allow_request(self):
+        """
+        Checks whether a call may go to the backend
+        Returns:
+            allowed: bool
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self.probing = False
+            if self.state == HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record(self, ok, latency):
+        """
+        Records the outcome of a call
+        Args:
+            ok: whether the call succeeded
+            latency: call duration in seconds
+        """
+        now = time.monotonic()
+        bad = not ok or latency > self.slow_call
+        with self.lock:
+            self.calls.append((now, ok, latency))
+            self._trim(now)
+            if self.state == HALF_OPEN:
+                self.probing = False
+                if bad:
+                    self._open(now)
+                else:
+                    self.state = CLOSED
+                    self.calls.clear()
+                    print(f"{Fore.GREEN}Circuit breaker for {self.name} closed{Style.RESET_ALL}")
+                return
+
+            bad_calls = sum(1 for _, call_ok, call_latency in self.calls if not call_ok or call_latency > self.slow_call)
+            if self.state == CLOSED and len(self.calls) >= self.min_calls and bad_calls / len(self.calls) >= self.error_rate:
+                self._open(now)
+
+    def abandon(self):
+        """
+        Releases the half-open probe of a call that was cancelled before it completed
+        """
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.probing = False
+
+    def _open(self, now):
+        self.state = OPEN
+        self.opened_at = now
+        print(f"{Fore.RED}Circuit breaker for {self.name} opened{Style.RESET_ALL}")
+
+    def snapshot(self):
+        """
+        Returns the health view of the backend
+        """
+        with self.lock:
+            self._trim(time.monotonic())
+            calls = len(self.calls)
+            failures = sum(1 for _, ok, _ in self.calls if not ok)
+            slow = sum(1 for _, ok, latency in self.calls if ok and latency > self.slow_call)
+            latencies = sorted(latency for _, ok, latency in self.calls if ok)
+            return {
+                "state": self.state,
+                "calls": calls,
+                "error_rate": failures / calls if calls else 0.0,
+                "slow_rate": slow / calls if calls else 0.0,
+                "p50_latency": latencies[len(latencies) // 2] if latencies else None,
+                "p95_latency": latencies[int(len(latencies) * 0.95)] if latencies else None,
+                "health_score": (calls - failures - slow) / calls if calls else 1.0,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name, **kwargs):
+    """
+    Gets the process-wide circuit breaker of a backend, creating it with the given settings on first use
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **kwargs)
+        return _breakers[name]
+
+
+def health_report():
+    """
+    Returns the health view of every backend that has been used
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+class GuardedRetriever(BaseSearch):
+    """
+    Wraps a retriever instance with its circuit breaker.
+    While the breaker is open the backend is skipped immediately, going to the fallback retriever if one is given.
+    Results of the fallback are returned as FallbackResults.
+    """
+    def __init__(self, retriever, breaker, fallback=None):
+        """
+        Initializes the GuardedRetriever object
+        Args:
+            retriever: retriever instance to guard
+            breaker: CircuitBreaker of the backend
+            fallback: retriever instance used when the backend is open or fails
+        """
+        self.retriever = retriever
+        self.breaker = breaker
+        self.fallback = fallback
+
+    async def search(self, query, max_results=7):
+        """
+        Searches the query through the breaker
+        Returns:
+
+        """
+        if self.breaker.allow_request():
+            start_time = time.monotonic()
+            try:
+                results = await self.retriever.search(query, max_results=max_results)
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except Exception as e:
+                self.breaker.record(False, time.monotonic() - start_time)
+                if self.fallback is None:
+                    raise
+                print(f"{Fore.RED}Error in {self.breaker.name} search, using fallback: {e}{Style.RESET_ALL}")
+            else:
+                # Retrievers return None when the response could not be parsed
+                self.breaker.record(results is not None, time.monotonic() - start_time)
+                if results is not None or self.fallback is None:
+                    return results
+        elif self.fallback is None:
+            raise CircuitOpenError(f"Circuit breaker for {self.breaker.name} is open.")
+
+        return self._from_fallback(await self.fallback.search(query, max_results=max_results))
+
+    @staticmethod
+    def _from_fallback(results):
+        return FallbackResults(results) if results is not None else None
+
+    async def search_many(self, queries, max_results=7):
+        """
+        Searches several queries through the breaker, as a single call to the backend
+        Returns:
+            results: list of search results, in the order of the queries
+        """
+        if self.breaker.allow_request():
+            start_time = time.monotonic()
+            try:
+                results = await self.retriever.search_many(queries, max_results=max_results)
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except Exception as e:
+                self.breaker.record(False, time.monotonic() - start_time)
+                if self.fallback is None:
+                    raise
+                print(f"{Fore.RED}Error in {self.breaker.name} search, using fallback: {e}{Style.RESET_ALL}")
+            else:
+                self.breaker.record(any(r is not None for r in results), time.monotonic() - start_time)
+                failed = [query for query, query_results in zip(queries, results) if query_results is None]
+                if not failed or self.fallback is None:
+                    return results
+                fallback_results = iter([self._from_fallback(query_results) for query_results in
+                                         await self.fallback.search_many(failed, max_results=max_results)])
+                return [next(fallback_results) if query_results is None else query_results
+                        for query_results in results]
+        elif self.fallback is None:
+            raise CircuitOpenError(f"Circuit breaker for {self.breaker.name} is open.")
+
+        return [self._from_fallback(query_results) for query_results in
+                await self.fallback.search_many(queries, max_results=max_results)]
@@ -0,0 +1,279 @@
+# Local Corpus Retriever
+
+# libraries
+import asyncio
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+from bs4 import BeautifulSoup
+from gpt_researcher.retrievers.base import BaseSearch
+
+SUPPORTED_EXTENSIONS = {".html", ".htm", ".md", ".markdown", ".txt", ".rst", ".pdf"}
+STOPWORDS = {"a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or",
+             "that", "the", "this", "to", "was", "were", "what", "when", "where", "which", "who", "with"}
+
+
+def tokenize(text):
+    return [token for token in re.findall(r"\w+", text.lower()) if token not in STOPWORDS]
+
+
+def extract_text(path):
+    """
+    Extracts the title and text of a local HTML, Markdown, PDF or text file
+    Args:
+        path: file path
+
+    Returns:
+        title: str
+        text: str
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    title = path.stem
+    if suffix == ".pdf":
+        import fitz
+        with fitz.open(str(path)) as pdf:
+            text = "\n".join(page.get_text() for page in pdf)
+            title = pdf.metadata.get("title") or title
+    elif suffix in (".html", ".htm"):
+        soup = BeautifulSoup(path.read_bytes(), "lxml")
+        for script_or_style in soup(["script", "style"]):
+            script_or_style.extract()
+        if soup.title and soup.title.string:
+            title = soup.title.string.strip()
+        text = "\n".join(line.strip() for line in soup.get_text("\n").splitlines() if line.strip())
+    else:
+        text = path.read_text(encoding="utf-8", errors="replace")
+        heading = re.search(r"^#\s+(.+)$", text, re.MULTILINE)
+        if heading:
+            title = heading.group(1).strip()
+    return title, text
+
+
+def file_url_to_path(url):
+    return unquote(urlparse(url).path)
+
+
+def corpus_file_path(url, corpus_path):
+    """
+    Resolves the file:// url of a document of the local corpus
+    Args:
+        url: file:// url
+        corpus_path: local corpus directory
+
+    Returns:
+        path: resolved file path, None when the file is outside the corpus directory
+    """
+    path = os.path.realpath(file_url_to_path(url))
+    corpus_path = os.path.realpath(corpus_path)
+    try:
+        inside = os.path.commonpath([path, corpus_path]) == corpus_path
+    except ValueError:
+        # On different drives
+        inside = False
+    return path if inside else None
+
+
+class LocalIndex:
+    """
+    On-disk inverted index of a local document collection with BM25 scoring.
+    Files are re-indexed incrementally: only new or modified files are parsed, and removed files are dropped.
+    """
+    def __init__(self, corpus_path, index_path, refresh_interval=60, k1=1.5, b=0.75):
+        """
+        Initializes the LocalIndex object
+        Args:
+            corpus_path: directory of documents to index
+            index_path: sqlite file holding the index
+            refresh_interval: seconds between scans of the corpus for changes
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+        """
+        self.corpus_path = os.path.abspath(corpus_path)
+        self.refresh_interval = refresh_interval
+        self.k1 = k1
+        self.b = b
+        self.last_refresh = 0
+        self.stats = None
+        self.lock = threading.Lock()
+        if os.path.dirname(index_path):
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        self.db = sqlite3.connect(index_path, check_same_thread=False)
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime REAL, size INTEGER,
+                title TEXT, length INTEGER, content TEXT);
+            CREATE TABLE IF NOT EXISTS postings (term TEXT, doc_id INTEGER, tf INTEGER);
+            CREATE INDEX IF NOT EXISTS postings_term ON postings (term);
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+        """)
+
+    def refresh(self, force=False):
+        """
+        Re-indexes the files that changed since the last scan
+        Returns:
+            changed: number of files added, updated or removed
+        """
+        with self.lock:
+            if not force and time.monotonic() - self.last_refresh < self.refresh_interval:
+                return 0
+            indexed = {path: (mtime, size) for path, mtime, size in
+                       self.db.execute("SELECT path, mtime, size FROM documents")}
+            found, changed = set(), 0
+            for root, _, files in os.walk(self.corpus_path):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if Path(name).suffix.lower() not in SUPPORTED_EXTENSIONS:
+                        continue
+                    found.add(path)
+                    stat = os.stat(path)
+                    if indexed.get(path) == (stat.st_mtime, stat.st_size):
+                        continue
+                    try:
+                        title, text = extract_text(path)
+                    except Exception as e:
+                        print(f"Error indexing {path}: {e}")
+                        continue
+                    self._remove(path)
+                    self._add(path, stat, title, text)
+                    changed += 1
+
+            for path in set(indexed) - found:
+                self._remove(path)
+                changed += 1
+
+            self.db.commit()
+            self.last_refresh = time.monotonic()
+            if changed or self.stats is None:
+                count, total_length = self.db.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents").fetchone()
+                self.stats = (count, total_length / count if count else 0)
+            return changed
+
+    def _add(self, path, stat, title, text):
+        terms = Counter(tokenize(f"{title}\n{text}"))
+        cursor = self.db.execute(
+            "INSERT INTO documents (path, mtime, size, title, length, content) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, stat.st_mtime, stat.st_size, title, sum(terms.values()), text))
+        self.db.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                            [(term, cursor.lastrowid, tf) for term, tf in terms.items()])
+
+    def _remove(self, path):
+        row = self.db.execute("SELECT id FROM documents WHERE path = ?", (path,)).fetchone()
+        if row:
+            self.db.execute("DELETE FROM postings WHERE doc_id = ?", row)
+            self.db.execute("DELETE FROM documents WHERE id = ?", row)
+
+    def search(self, query, max_results=7):
+        """
+        Ranks the indexed documents against the query with BM25
+        Returns:
+            results: list of (path, title, content) tuples, best first
+        """
+        self.refresh()
+        with self.lock:
+            doc_count, avg_length = self.stats
+            if not doc_count:
+                return []
+            scores = Counter()
+            for term in set(tokenize(query)):
+                postings = self.db.execute(
+                    "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN documents d ON d.id = p.doc_id "
+                    "WHERE p.term = ?", (term,)).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf, length in postings:
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            top_ids = [doc_id for doc_id, _ in scores.most_common(max_results)]
+            if not top_ids:
+                return []
+            rows = self.db.execute(
+                f"SELECT id, path, title, content FROM documents WHERE id IN ({','.join('?' * len(top_ids))})",
+                top_ids).fetchall()
+            by_id = {row[0]: row[1:] for row in rows}
+            return [by_id[doc_id] for doc_id in top_ids if doc_id in by_id]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_local_index(corpus_path, index_path, refresh_interval=60):
+    """
+    Gets the process-wide index of a corpus
+    """
+    key = (os.path.abspath(corpus_path), os.path.abspath(index_path))
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = LocalIndex(corpus_path, index_path, refresh_interval=refresh_interval)
+        return _indexes[key]
+
+
+class LocalSearch(BaseSearch):
+    """
+    Local Corpus Retriever
+    Searches a local directory of HTML, Markdown, PDF and text files, with no network access
+    """
+    def __init__(self):
+        """
+        Initializes the LocalSearch object
+        """
+        self.corpus_path = self.get_corpus_path()
+        self.index = get_local_index(self.corpus_path, os.getenv("LOCAL_INDEX_PATH", "local_index.db"),
+                                     refresh_interval=float(os.getenv("LOCAL_INDEX_REFRESH", 60)))
+
+    def get_corpus_path(self):
+        """
+        Gets the local corpus directory
+        Returns:
+
+        """
+        try:
+            corpus_path = os.environ["LOCAL_CORPUS_PATH"]
+        except:
+            raise Exception("Local corpus path not found. Please set the LOCAL_CORPUS_PATH environment variable "
+                            "to the directory of documents to research.")
+        return corpus_path
+
+    @staticmethod
+    def _snippet(content, query, length=300):
+        terms = tokenize(query)
+        lowered = content.lower()
+        positions = [lowered.find(term) for term in terms if lowered.find(term) >= 0]
+        start = max(min(positions) - length // 3, 0) if positions else 0
+        return " ".join(content[start:start + length].split())
+
+    async def search(self, query, max_results=7):
+        """
+        Searches the query
+        Returns:
+
+        """
+        results = await asyncio.to_thread(self.index.search, query, max_results)
+        return self._normalize_results(query, results)
+
+    async def search_many(self, queries, max_results=7):
+        """
+        Searches several queries in a single trip to the index thread
+        Returns:
+            results: list of search results, in the order of the queries
+        """
+        def search_all():
+            return [self.index.search(query, max_results) for query in queries]
+
+        results = await asyncio.to_thread(search_all)
+        return [self._normalize_results(query, query_results) for query, query_results in zip(queries, results)]
+
+    def _normalize_results(self, query, results):
+        # Normalizing results to match the format of the other search APIs
+        return [{"href": Path(path).as_uri(), "title": title, "body": self._snippet(content, query)}
+                for path, title, content in results]
@@ -1,47 +1,46 @@
-# Tavily API Retriever
+# Searx Retriever
 
 # libraries
 import os
-from tavily import TavilyClient
-from langchain.utilities import SearxSearchWrapper
+from gpt_researcher.utils.http import get_http_session
+from gpt_researcher.retrievers.base import BaseSearch
 
 
-class SearxSearch():
+class SearxSearch(BaseSearch):
     """
-    Tavily API Retriever
+    Searx Retriever
     """
-    def __init__(self, query):
+    def __init__(self):
         """
-        Initializes the TavilySearch object
-        Args:
-            query:
+        Initializes the SearxSearch object
         """
-        self.query = query
-        self.api_key = self.get_api_key()
-        self.client = TavilyClient(self.api_key)
+        self.searx_url = self.get_searx_url()
 
-    def get_api_key(self):
+    def get_searx_url(self):
         """
-        Gets the Tavily API key
+        Gets the Searx instance URL
         Returns:
 
         """
-        # Get the API key
+        # Get the Searx URL
         try:
-            api_key = os.environ["SEARX_URL"]
+            searx_url = os.environ["SEARX_URL"]
         except:
             raise Exception("Searx URL key not found. Please set the SEARX_URL environment variable. "
                             "You can get your key from https://searx.space/")
-        return api_key
+        return searx_url
 
-    def search(self, max_results=7):
+    async def search(self, query, max_results=7):
         """
         Searches the query
         Returns:
 
         """
-        searx = SearxSearchWrapper(searx_host=os.environ["SEARX_URL"])
-        results = searx.results(self.query, max_results)
+        params = {"q": query, "format": "json"}
+        async with get_http_session().get(f"{self.searx_url.rstrip('/')}/search", params=params) as resp:
+            resp.raise_for_status()
+            results = await resp.json()
         # Normalizing results to match the format of the other search APIs
-        search_response = [{"href": obj["link"], "body": obj["snippet"]} for obj in results]
+        search_response = [{"href": obj["url"], "body": obj.get("content", "")}
+                           for obj in results.get("results", [])[:max_results]]
         return search_response
@@ -2,22 +2,20 @@
 
 # libraries
 import os
-import requests
 import json
+from gpt_researcher.utils.http import get_http_session
+from gpt_researcher.retrievers.base import BaseSearch
 
 
-class SerpApiSearch():
+class SerpApiSearch(BaseSearch):
     """
     SerpApi Retriever
     """
-    def __init__(self, query):
+    def __init__(self):
         """
         Initializes the SerpApiSearch object
-        Args:
-            query:
         """
         raise NotImplementedError("SerpApiSearch is not fully implemented yet.")
-        self.query = query
         self.api_key = self.get_api_key()
 
     def get_api_key(self):
@@ -33,28 +31,25 @@ class SerpApiSearch():
                             "You can get a key at https://serpapi.com/")
         return api_key
 
-    def search(self, max_results=7):
+    async def search(self, query, max_results=7):
         """
         Searches the query
         Returns:
 
         """
-        print("Searching with query {0}...".format(self.query))
+        print("Searching with query {0}...".format(query))
         """Useful for general internet search queries using SerpApi."""
 
 
         # Perform the search
-        # TODO: query needs to be url encoded, so the code won't work as is.
-        # Encoding should look something like this (but this is untested):
-        # url_encoded_query = self.query.replace(" ", "+")
-        url = "https://serpapi.com/search.json?engine=google&q=" + self.query + "&api_key=" + self.api_key
-        resp = requests.request("GET", url)
+        url = "https://serpapi.com/search.json"
+        params = {"engine": "google", "q": query, "api_key": self.api_key}
+        async with get_http_session().get(url, params=params) as resp:
+            text = await resp.text()
 
         # Preprocess the results
-        if resp is None:
-            return
         try:
-            search_results = json.loads(resp.text)
+            search_results = json.loads(text)
         except Exception:
             return
         if search_results is None:
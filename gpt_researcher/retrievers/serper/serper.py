@@ -2,21 +2,19 @@
 
 # libraries
 import os
-import requests
 import json
+from gpt_researcher.utils.http import get_http_session
+from gpt_researcher.retrievers.base import BaseSearch
 
 
-class SerperSearch():
+class SerperSearch(BaseSearch):
     """
     Google Serper Retriever
     """
-    def __init__(self, query):
+    def __init__(self):
         """
         Initializes the SerperSearch object
-        Args:
-            query:
         """
-        self.query = query
         self.api_key = self.get_api_key()
 
     def get_api_key(self):
@@ -32,38 +30,55 @@ class SerperSearch():
                             "You can get a key at https://serper.dev/")
         return api_key
 
-    def search(self, max_results=7):
+    async def search(self, query, max_results=7):
         """
         Searches the query
         Returns:
 
         """
-        print("Searching with query {0}...".format(self.query))
+        print("Searching with query {0}...".format(query))
         """Useful for general internet search queries using the Serp API."""
 
 
         # Search the query (see https://serper.dev/playground for the format)
+        data = json.dumps({"q": query})
+        search_results = await self._post(data)
+        if search_results is None:
+            return
+        return self._normalize_results(search_results)
+
+    async def search_many(self, queries, max_results=7):
+        """
+        Searches several queries with a single request to the Serper batch endpoint
+        Returns:
+            results: list of search results, in the order of the queries
+        """
+        print("Searching with queries {0}...".format(queries))
+        data = json.dumps([{"q": query} for query in queries])
+        search_results = await self._post(data)
+        if not isinstance(search_results, list) or len(search_results) != len(queries):
+            return await super().search_many(queries, max_results=max_results)
+        return [self._normalize_results(results) for results in search_results]
+
+    async def _post(self, data):
         url = "https://google.serper.dev/search"
 
         headers = {
         'X-API-KEY': self.api_key,
         'Content-Type': 'application/json'
         }
-        data = json.dumps({"q": self.query})
 
-        resp = requests.request("POST", url, headers=headers, data=data)
+        async with get_http_session().post(url, headers=headers, data=data) as resp:
+            text = await resp.text()
 
         # Preprocess the results
-        if resp is None:
-            return
         try:
-            search_results = json.loads(resp.text)
+            return json.loads(text)
         except Exception:
             return
-        if search_results is None:
-            return
 
-        results = search_results["organic"]
+    def _normalize_results(self, search_results):
+        results = search_results.get("organic", [])
         search_results = []
 
         # Normalize the results to match the format of the other search APIs
@@ -74,7 +89,7 @@ class SerperSearch():
             search_result = {
                 "title": result["title"],
                 "href": result["link"],
-                "body": result["snippet"],
+                "body": result.get("snippet", ""),
             }
             search_results.append(search_result)
 
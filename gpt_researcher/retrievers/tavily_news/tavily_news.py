@@ -2,23 +2,22 @@
 
 # libraries
 import os
-from tavily import TavilyClient
+from gpt_researcher.utils.http import get_http_session
+from gpt_researcher.retrievers.base import BaseSearch
 
 
-class TavilyNews():
+class TavilyNews(BaseSearch):
     """
     Tavily News API Retriever
     Retrieve news articles from the Tavily News API
     """
-    def __init__(self, query):
+    base_url = "https://api.tavily.com/search"
+
+    def __init__(self):
         """
-        Initializes the TavilySearch object
-        Args:
-            query:
+        Initializes the TavilyNews object
         """
-        self.query = query
         self.api_key = self.get_api_key()
-        self.client = TavilyClient(self.api_key)
 
     def get_api_key(self):
         """
@@ -34,14 +33,23 @@ class TavilyNews():
                             "You can get a key at https://app.tavily.com")
         return api_key
 
-    def search(self, max_results=7):
+    async def search(self, query, max_results=7):
         """
         Searches the query
         Returns:
 
         """
         # Search the query
-        results = self.client.search(self.query, search_depth="advanced", topic="news", max_results=max_results)
+        data = {
+            "query": query,
+            "search_depth": "advanced",
+            "topic": "news",
+            "max_results": max_results,
+            "api_key": self.api_key,
+        }
+        async with get_http_session().post(self.base_url, json=data) as resp:
+            resp.raise_for_status()
+            results = await resp.json()
         # Return the results
         search_response = [{"href": obj["url"], "body": obj["content"]} for obj in results.get("results", [])]
         return search_response
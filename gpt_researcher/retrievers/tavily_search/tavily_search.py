@@ -2,23 +2,21 @@
 
 # libraries
 import os
-from tavily import TavilyClient
-from duckduckgo_search import DDGS
+from gpt_researcher.utils.http import get_http_session
+from gpt_researcher.retrievers.base import BaseSearch
 
 
-class TavilySearch():
+class TavilySearch(BaseSearch):
     """
     Tavily API Retriever
     """
-    def __init__(self, query):
+    base_url = "https://api.tavily.com/search"
+
+    def __init__(self):
         """
         Initializes the TavilySearch object
-        Args:
-            query:
         """
-        self.query = query
         self.api_key = self.get_api_key()
-        self.client = TavilyClient(self.api_key)
 
     def get_api_key(self):
         """
@@ -34,18 +32,24 @@ class TavilySearch():
                             "You can get a key at https://app.tavily.com")
         return api_key
 
-    def search(self, max_results=7):
+    async def search(self, query, max_results=7):
         """
         Searches the query
         Returns:
 
         """
-        try:
-            # Search the query
-            results = self.client.search(self.query, search_depth="advanced", max_results=max_results)
-            # Return the results
-            search_response = [{"href": obj["url"], "body": obj["content"]} for obj in results.get("results", [])]
-        except Exception as e: # Fallback in case overload on Tavily Search API
-            ddg = DDGS()
-            search_response = ddg.text(self.query, region='wt-wt', max_results=max_results)
+        # Search the query
+        # The DuckDuckGo fallback for an overloaded Tavily API is wired in build_retriever behind a circuit breaker
+        data = {
+            "query": query,
+            "search_depth": "advanced",
+            "topic": "general",
+            "max_results": max_results,
+            "api_key": self.api_key,
+        }
+        async with get_http_session().post(self.base_url, json=data) as resp:
+            resp.raise_for_status()
+            results = await resp.json()
+        # Return the results
+        search_response = [{"href": obj["url"], "body": obj["content"]} for obj in results.get("results", [])]
         return search_response
@@ -1,22 +1,52 @@
+from concurrent.futures import FIRST_COMPLETED, wait
 from concurrent.futures.thread import ThreadPoolExecutor
 from langchain.document_loaders import PyMuPDFLoader
-from langchain.retrievers import ArxivRetriever
-from functools import partial
+import os
+import tempfile
+import threading
+import time
 import requests
 from bs4 import BeautifulSoup
+from gpt_researcher.retrievers.local.local import corpus_file_path, extract_text
+
+# Process-wide pool fetching the links, so fetches abandoned by cancelled researches cannot starve the default
+# executor running the asyncio.to_thread calls
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_scrape_executor():
+    """Gets the process-wide pool fetching the links, sized by SCRAPER_MAX_WORKERS."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=int(os.getenv("SCRAPER_MAX_WORKERS", 20)),
+                                           thread_name_prefix="scraper")
+        return _executor
 
 
 class Scraper:
     """
     Scraper class to extract the content from the links
     """
-    def __init__(self, urls, user_agent):
+    # Seconds a pdf download may take in total
+    pdf_timeout = 20
+    # Seconds between two checks of the cancel event while waiting for the fetches
+    cancel_poll_interval = 0.1
+
+    def __init__(self, urls, user_agent, url_index=None, cancel_event=None):
         """
         Initialize the Scraper class.
         Args:
             urls:
+            user_agent:
+            url_index: URLIndex recording redirect targets, so pages already visited under another url are skipped
+            cancel_event: threading.Event set when the research was cancelled, so the remaining links are not fetched
+                and the fetched content is dropped
         """
         self.urls = urls
+        self.url_index = url_index
+        self.cancel_event = cancel_event
         self.session = requests.Session()
         self.session.headers.update({
             "User-Agent": user_agent
@@ -26,19 +56,33 @@ class Scraper:
         """
         Extracts the content from the links
         """
-        partial_extract = partial(self.extract_data_from_link, session=self.session)
-        with ThreadPoolExecutor(max_workers=20) as executor:
-            contents = executor.map(partial_extract, self.urls)
-        res = [content for content in contents if content['raw_content'] is not None]
+        executor = get_scrape_executor()
+        futures = [executor.submit(self.extract_data_from_link, link, self.session) for link in self.urls]
+        pending = set(futures)
+        while pending:
+            _, pending = wait(pending, timeout=self.cancel_poll_interval, return_when=FIRST_COMPLETED)
+            if pending and self.is_cancelled():
+                # Stop waiting: the running fetches end within their timeout and the queued ones are dropped
+                for future in pending:
+                    future.cancel()
+                return []
+        res = [content for content in (future.result() for future in futures) if content['raw_content'] is not None]
         return res
 
+    def is_cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
     def extract_data_from_link(self, link, session):
         """
         Extracts the data from the link
         """
         content = ""
+        if self.is_cancelled():
+            return {'url': link, 'raw_content': None}
         try:
-            if link.endswith(".pdf"):
+            if link.startswith("file://"):
+                content = self.scrape_local_file(link)
+            elif link.endswith(".pdf"):
                 content = self.scrape_pdf_with_pymupdf(link)
             elif "arxiv.org" in link:
                 doc_num = link.split("/")[-1]
@@ -46,7 +90,8 @@ class Scraper:
             elif link:
                 content = self.scrape_text_with_bs(link, session)
 
-            if len(content) < 100:
+            # The research may have been cancelled during the fetch
+            if len(content) < 100 or self.is_cancelled():
                 return {'url': link, 'raw_content': None}
             return {'url': link, 'raw_content': content}
         except Exception as e:
@@ -54,6 +99,8 @@ class Scraper:
 
     def scrape_text_with_bs(self, link, session):
         response = session.get(link, timeout=4)
+        if self.url_index is not None and not self.url_index.add_redirect(link, response.url):
+            return ""
         soup = BeautifulSoup(response.content, 'lxml', from_encoding=response.encoding)
 
         for script_or_style in soup(["script", "style"]):
@@ -65,32 +112,70 @@ class Scraper:
         content = "\n".join(chunk for chunk in chunks if chunk)
         return content
 
+    def scrape_local_file(self, url) -> str:
+        """Scrape a file of the local corpus
+        Only files inside LOCAL_CORPUS_PATH are read, so a stray file:// url cannot put host files into a report.
+
+        Args:
+            url (str): The file:// url of the document
+
+        Returns:
+            str: The text of the document, empty when the file is outside the local corpus
+        """
+        corpus_path = os.getenv("LOCAL_CORPUS_PATH")
+        path = corpus_file_path(url, corpus_path) if corpus_path else None
+        if path is None:
+            print(f"Skipping {url}: not in the local corpus")
+            return ""
+        _, text = extract_text(path)
+        return text
+
     def scrape_pdf_with_pymupdf(self, url) -> str:
         """Scrape a pdf with pymupdf
+        The pdf is downloaded through the session within pdf_timeout seconds, then parsed from a temporary file.
 
         Args:
             url (str): The url of the pdf to scrape
 
         Returns:
-            str: The text scraped from the pdf
+            str: The text scraped from the pdf, empty when the download timed out or the research was cancelled
         """
-        loader = PyMuPDFLoader(url)
-        doc = loader.load()
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as file:
+            if not self.download(url, file):
+                return ""
+            file.flush()
+            doc = PyMuPDFLoader(file.name).load()
         return str(doc)
 
-    def scrape_pdf_with_arxiv(self, query) -> str:
-        """Scrape a pdf with arxiv
-        default document length of 70000 about ~15 pages or None for no limit
+    def scrape_pdf_with_arxiv(self, doc_num) -> str:
+        """Scrape the pdf of an arxiv paper
 
         Args:
-            query (str): The query to search for
+            doc_num (str): The arxiv id of the paper
 
         Returns:
             str: The text scraped from the pdf
         """
-        retriever = ArxivRetriever(load_max_docs=2, doc_content_chars_max=None)
-        docs = retriever.get_relevant_documents(query=query)
-        return docs[0].page_content
+        return self.scrape_pdf_with_pymupdf(f"https://arxiv.org/pdf/{doc_num}")
+
+    def download(self, url, file) -> bool:
+        """Downloads a url into a file, giving up after pdf_timeout seconds or when the research is cancelled
+
+        Args:
+            url (str): The url to download
+            file: The binary file to write to
+
+        Returns:
+            bool: Whether the download completed
+        """
+        deadline = time.monotonic() + self.pdf_timeout
+        with self.session.get(url, timeout=4, stream=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=8 * 1024):
+                if time.monotonic() > deadline or self.is_cancelled():
+                    return False
+                file.write(chunk)
+        return True
 
     def get_content_from_url(self, soup):
         """Get the text from the soup
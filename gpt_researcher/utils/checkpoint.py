@@ -0,0 +1,85 @@
+# Stage checkpoints of research jobs
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class CheckpointStore:
+    """
+    sqlite store of the completed stages of research jobs, so a job started again with the same id resumes
+    from its last completed stage instead of paying for every LLM call, search and scrape again.
+    Its methods block on sqlite, so async code calls them through asyncio.to_thread.
+    """
+    def __init__(self, path, max_age=7 * 24 * 3600):
+        """
+        Initializes the CheckpointStore object
+        Args:
+            path: sqlite file holding the checkpoints
+            max_age: seconds after which the checkpoints of a job are dropped when the store is opened
+        """
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS checkpoints (job_id TEXT, stage TEXT, data TEXT, "
+                        "updated_at REAL, PRIMARY KEY (job_id, stage))")
+        self.db.execute("DELETE FROM checkpoints WHERE job_id IN "
+                        "(SELECT job_id FROM checkpoints GROUP BY job_id HAVING MAX(updated_at) < ?)",
+                        (time.time() - max_age,))
+        self.db.commit()
+
+    def load(self, job_id, stage):
+        """
+        Loads the checkpoint of a stage
+        Args:
+            job_id: research job id
+            stage: stage name
+
+        Returns:
+            data: the saved data, None when the stage has no checkpoint
+        """
+        with self.lock:
+            row = self.db.execute("SELECT data FROM checkpoints WHERE job_id = ? AND stage = ?",
+                                  (job_id, stage)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, job_id, stage, data):
+        """
+        Saves the checkpoint of a completed stage
+        Args:
+            job_id: research job id
+            stage: stage name
+            data: JSON-serializable stage output
+        """
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)",
+                            (job_id, stage, json.dumps(data), time.time()))
+            self.db.commit()
+
+    def clear(self, job_id):
+        """Removes every checkpoint of a job."""
+        with self.lock:
+            self.db.execute("DELETE FROM checkpoints WHERE job_id = ?", (job_id,))
+            self.db.commit()
+
+    def stages(self, job_id):
+        """Returns the names of the checkpointed stages of a job."""
+        with self.lock:
+            return [stage for (stage,) in self.db.execute(
+                "SELECT stage FROM checkpoints WHERE job_id = ? ORDER BY updated_at", (job_id,))]
+
+
+def get_checkpoint_store(path):
+    """
+    Gets the process-wide checkpoint store for the given sqlite path
+    """
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = CheckpointStore(path, max_age=float(os.getenv("CHECKPOINT_MAX_AGE_DAYS", 7)) * 24 * 3600)
+        return _stores[path]
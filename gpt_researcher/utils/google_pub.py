@@ -3,34 +3,171 @@ from google.oauth2 import service_account
 import jwt
 import os
 import json
+import threading
+from gpt_researcher.utils.transport import PubSubTransport, get_transport
+
+# Process-wide publisher, batching the messages of every research
+_publisher = None
+_publisher_lock = threading.Lock()
+# Updated from the publisher callback threads
+_stats = {"published": 0, "failed": 0}
+_stats_lock = threading.Lock()
+
+
+def get_credentials():
+    """
+    Gets the service account credentials of AUTH_JSON, or None when connecting to the Pub/Sub emulator
+    Returns:
+        credentials: service_account.Credentials
+    """
+    if os.environ.get("PUBSUB_EMULATOR_HOST"):
+        # The clients connect to the emulator by themselves and need no credentials
+        return None
+    auth_file = os.environ.get("AUTH_JSON", None)
+    if not auth_file:
+        raise Exception("AUTH_JSON not set.")
+    return service_account.Credentials.from_service_account_file(auth_file)
+
+
+def get_publisher():
+    """
+    Gets the process-wide PublisherClient, created on first use with batch settings and per-user message ordering
+    Returns:
+        publisher: PublisherClient
+    """
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            batch_settings = pubsub_v1.types.BatchSettings(
+                max_messages=int(os.environ.get("PUBSUB_BATCH_MAX_MESSAGES", 100)),
+                max_bytes=int(os.environ.get("PUBSUB_BATCH_MAX_BYTES", 1024 * 1024)),
+                max_latency=float(os.environ.get("PUBSUB_BATCH_MAX_LATENCY", 0.05)),
+            )
+            publisher_options = pubsub_v1.types.PublisherOptions(enable_message_ordering=True)
+            _publisher = pubsub_v1.PublisherClient(credentials=get_credentials(), batch_settings=batch_settings,
+                                                   publisher_options=publisher_options)
+        return _publisher
+
+
+def close_publisher():
+    """Publishes the pending batches and stops the process-wide publisher."""
+    global _publisher
+    with _publisher_lock:
+        if _publisher is not None:
+            _publisher.stop()
+            _publisher = None
+
+
+def publish_stats():
+    """Counts of the messages published and failed by this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+class GooglePubSubTransport(PubSubTransport):
+    """Google Cloud Pub/Sub transport, publishing through the process-wide batching publisher."""
+    def __init__(self, publisher=None):
+        """
+        Initialize the GooglePubSubTransport class.
+        Args:
+            publisher: publisher client to use instead of the process-wide one (optional)
+        """
+        self._publisher = publisher
+        self.subscriber = None
+
+    @property
+    def publisher(self):
+        if self._publisher is None:
+            self._publisher = get_publisher()
+        return self._publisher
+
+    def topic_path(self, topic):
+        return self.publisher.topic_path(os.environ.get("PROJECT_ID", None), topic)
+
+    def publish(self, topic, data, ordering_key=""):
+        return self.publisher.publish(self.topic_path(topic), data=data, ordering_key=ordering_key)
+
+    def resume_publish(self, topic, ordering_key):
+        self.publisher.resume_publish(self.topic_path(topic), ordering_key)
+
+    def subscribe(self, subscription, callback, max_messages, max_lease_duration=None):
+        if self.subscriber is None:
+            self.subscriber = pubsub_v1.SubscriberClient(credentials=get_credentials())
+        # Define the subscription path
+        subscription_path = self.subscriber.subscription_path(os.environ.get("PROJECT_ID", None), subscription)
+        flow_control = pubsub_v1.types.FlowControl(max_messages=max_messages,
+                                                   max_lease_duration=max_lease_duration or 3600)
+        return self.subscriber.subscribe(subscription_path, callback=callback, flow_control=flow_control)
+
+    def stop(self):
+        if self.subscriber is not None:
+            self.subscriber.close()
+            self.subscriber = None
+        if self._publisher is not None and self._publisher is not _publisher:
+            self._publisher.stop()
+        else:
+            close_publisher()
+
 
 # Set the Google Cloud project and Pub/Sub topic
 class PublishManager:
     """Manage Google Publish Message"""
-    def __init__(self):
-        """Initialize the Google PubSub class."""
+    def __init__(self, transport=None):
+        """
+        Initialize the Google PubSub class.
+        Args:
+            transport: PubSubTransport to use instead of the process-wide one (optional)
+        """
+        self._transport = transport
 
-    def publish_message(self, message_data):
-        """Publish a message to the topic."""
+    @property
+    def transport(self):
+        if self._transport is None:
+            self._transport = get_transport()
+        return self._transport
+
+    def publish_message(self, message_data, callback=None):
+        """
+        Publishes a message to the topic without waiting for it to be sent.
+        Messages of the same user share an ordering key, so they are delivered in the order they were published.
+        Args:
+            message_data: message to publish
+            callback: optional function called with the message id, or None when publishing failed
+
+        Returns:
+            future: publish future
+        """
         secret_key = os.environ.get("JWT_SECRET_KEY", None)
         pub_topic_name = os.environ.get("PUB_TOPIC", None)
         project_id = os.environ.get("PROJECT_ID", None)
-        auth_file = os.environ.get("AUTH_JSON", None)
 
-        if not secret_key or not pub_topic_name or not project_id or not auth_file:
+        if not secret_key or not pub_topic_name or not project_id:
             raise Exception("JWT_SECRET_KEY not set.")
 
-        credentials = service_account.Credentials.from_service_account_file(auth_file)
-        self.publisher = pubsub_v1.PublisherClient(credentials=credentials)
-
         encoded_payload = jwt.encode(message_data, secret_key, algorithm='HS256')
         payload = { "message": encoded_payload, "message_type": message_data.get("message_type") }
-        # Define the topic path
-        topic_path = self.publisher.topic_path(project_id, pub_topic_name)
+        user_id = message_data.get("user_id")
+        ordering_key = str(user_id) if user_id is not None else ""
 
         json_string = json.dumps(payload)
-        # Publish a message to the topic
-        future = self.publisher.publish(topic_path, data=json_string.encode('UTF-8'))
-        # Wait for the message to be published
-        message_id = future.result()
-        print(f"Published message to {pub_topic_name} : {message_id}")
+        # Publish a message to the topic, the client sends it with the next batch
+        future = self.transport.publish(pub_topic_name, json_string.encode('UTF-8'), ordering_key=ordering_key)
+
+        def on_published(future):
+            try:
+                message_id = future.result()
+                with _stats_lock:
+                    _stats["published"] += 1
+            except Exception as e:
+                message_id = None
+                with _stats_lock:
+                    _stats["failed"] += 1
+                print(f"Error publishing message to {pub_topic_name}: {e}")
+                # A failed publish pauses its ordering key until it is resumed
+                if ordering_key:
+                    self.transport.resume_publish(pub_topic_name, ordering_key)
+            if callback is not None:
+                callback(message_id)
+
+        future.add_done_callback(on_published)
+        return future
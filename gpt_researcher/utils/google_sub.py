@@ -1,9 +1,13 @@
 import asyncio
-from google.cloud import pubsub_v1
-from google.oauth2 import service_account
+import threading
+import time
 from gpt_researcher.master.agent import GPTResearcher
 from backend.utils import write_md_to_pdf
 from gpt_researcher.utils.google_pub import PublishManager
+from gpt_researcher.utils.http import close_http_session
+from gpt_researcher.utils.metrics import WorkerMetrics
+from gpt_researcher.utils.progress import ProgressStream
+from gpt_researcher.utils.transport import get_transport
 import jwt
 import datetime
 import os
@@ -13,29 +17,59 @@ import json
 publish_manager = PublishManager()
 
 class SubscribeManager:
-    """Manage Google PubSub"""
-    def __init__(self):
-        """Initialize the Google PubSub class."""
-        self.subscriber = None
+    """
+    Manage Google PubSub
+    Messages are handed from the client's callback threads to a long-lived event loop, where at most max_workers
+    researches run at the same time. Flow control lets the client lease max_workers + max_queued messages, and the
+    ack deadline of a message is extended while its research runs. Stopping the subscriber cancels the running
+    researches and nacks their messages, so they are redelivered.
+    """
+    def __init__(self, transport=None):
+        """
+        Initialize the Google PubSub class.
+        Args:
+            transport: PubSubTransport to use instead of the process-wide one (optional)
+        """
+        self.transport = transport
         self.secret_key = None
         self.sub_topic_name = None
         self.project_id = None
         self.auth_file = None
-
+        self.streaming_pull = None
+        self.loop = None
+        self.loop_thread = None
+        self.workers = None
+        # Researches running longer are cancelled, so an abandoned message does not hold a worker forever
+        self.research_timeout = float(os.environ.get("RESEARCH_TIMEOUT", 1800))
+        self.max_workers = int(os.environ.get("PUBSUB_MAX_WORKERS", os.environ.get("MAX_CONCURRENT_RESEARCH", 4)))
+        self.max_queued = int(os.environ.get("PUBSUB_MAX_QUEUED", self.max_workers))
+        self.ack_extension = int(os.environ.get("PUBSUB_ACK_EXTENSION", 60))
+        self.tasks = set()
+        self.stopping = False
+        self.stats = WorkerMetrics(["received", "completed", "failed", "cancelled"])
 
     def callback(self, message):
         print(f"Received message ID: {message.message_id}.")
-        data = message.data.decode('utf-8')
-        json_data = json.loads(data)
-        payload = json_data.get("message")
-        message_type = json_data.get("message_type")
+        if self.stopping:
+            message.nack()
+            return
+        received_at = time.monotonic()
+        self.stats.count("received")
+        message_type = None
+        user_id = None
         try:
+            data = message.data.decode('utf-8')
+            json_data = json.loads(data)
+            payload = json_data.get("message")
+            message_type = json_data.get("message_type")
             decoded_payload = jwt.decode(payload, self.secret_key, algorithms='HS256')
             task = decoded_payload.get("task")
             report_type = decoded_payload.get("report_type")
             user_id = decoded_payload.get("user_id")
             if task and report_type:
-                asyncio.run(self.handle_researcher(message, task, report_type, message_type, user_id))
+                # Hand the message to the event loop and release the callback thread right away
+                asyncio.run_coroutine_threadsafe(
+                    self.process_message(message, task, report_type, message_type, user_id, received_at), self.loop)
             else:
                 print("Error: not enough parameters provided.")
                 message.ack()
@@ -44,6 +78,16 @@ class SubscribeManager:
             publish_manager.publish_message({"type": "error", "output": f"ERROR : {e}", "message_type": message_type, "user_id": user_id})
             message.ack()
 
+    def start_loop(self):
+        """Starts the event loop running the researches on its own thread."""
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, name="pubsub-research-loop", daemon=True)
+        self.loop_thread.start()
+        self.workers = asyncio.run_coroutine_threadsafe(self._create_semaphore(), self.loop).result()
+
+    async def _create_semaphore(self):
+        return asyncio.Semaphore(self.max_workers)
+
     async def start_subscriber(self):
         """Start the subscriber task."""
         self.secret_key = os.environ.get("JWT_SECRET_KEY", None)
@@ -51,35 +95,110 @@ class SubscribeManager:
         self.project_id = os.environ.get("PROJECT_ID", None)
         self.auth_file = os.environ.get("AUTH_JSON", None)
 
-        credentials = service_account.Credentials.from_service_account_file(self.auth_file)
-        self.subscriber = pubsub_v1.SubscriberClient(credentials=credentials)
-        # Define the subscription path
-        subscription_path = self.subscriber.subscription_path(self.project_id, self.sub_topic_name)
-        flow_control = pubsub_v1.types.FlowControl(max_messages=5)
-        self.subscriber.subscribe(subscription_path, callback=self.callback, flow_control=flow_control)
-        print(f"Listening for messages on {self.sub_topic_name}...")
+        self.start_loop()
+        if self.transport is None:
+            self.transport = get_transport()
+        self.streaming_pull = self.transport.subscribe(self.sub_topic_name, self.callback,
+                                                       max_messages=self.max_workers + self.max_queued,
+                                                       max_lease_duration=self.research_timeout + self.ack_extension)
+        print(f"Listening for messages on {self.sub_topic_name} with {self.max_workers} workers...")
+
+    def stop_subscriber(self):
+        """Stops pulling messages, cancels the running researches and stops the event loop running them."""
+        # Messages still delivered are nacked, and the researches are cancelled while their nacks can still be sent
+        self.stopping = True
+        if self.loop is not None:
+            asyncio.run_coroutine_threadsafe(self.cancel_researches(), self.loop).result(timeout=30)
+        if self.streaming_pull is not None:
+            self.streaming_pull.cancel()
+            self.streaming_pull = None
+        if self.loop is not None:
+            asyncio.run_coroutine_threadsafe(close_http_session(), self.loop).result(timeout=10)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop_thread.join(timeout=10)
+            self.loop = None
 
-    async def run_agent(self, task, report_type, websocket, message_type, user_id):
-        """Run the agent."""
+    async def cancel_researches(self):
+        """Cancels the researches of the messages being processed, which nacks them."""
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def extend_ack_deadline(self, message):
+        """Keeps extending the ack deadline of a message while its research runs."""
+        while True:
+            message.modify_ack_deadline(self.ack_extension)
+            await asyncio.sleep(self.ack_extension / 2)
+
+    async def process_message(self, message, task, report_type, message_type, user_id, received_at):
+        """Runs the research of a message once a worker is free."""
+        current_task = asyncio.current_task()
+        self.tasks.add(current_task)
+        heartbeat = asyncio.create_task(self.extend_ack_deadline(message))
+        try:
+            async with self.workers:
+                started_at = time.monotonic()
+                self.stats.start(started_at - received_at)
+                try:
+                    await self.handle_researcher(message, task, report_type, message_type, user_id)
+                    self.stats.count("completed")
+                except Exception as e:
+                    self.stats.count("failed")
+                    print(f"Error SUB: {e}")
+                    publish_manager.publish_message({"type": "error", "output": f"ERROR : {e}", "message_type": message_type, "user_id": user_id})
+                    message.ack()
+                finally:
+                    self.stats.finish(time.monotonic() - started_at)
+        except asyncio.CancelledError:
+            # The subscriber is stopping: the message goes back to the subscription for another subscriber
+            self.stats.count("cancelled")
+            message.nack()
+            raise
+        finally:
+            heartbeat.cancel()
+            self.tasks.discard(current_task)
+
+    async def run_agent(self, task, report_type, websocket, message_type, user_id, job_id=None):
+        """Run the agent, resuming the checkpointed stages of job_id if given."""
         # measure time
         start_time = datetime.datetime.now()
         # add customized JSON config file path here
         config_path = None
         # run agent
-        researcher = GPTResearcher(query=task, report_type=report_type, source_urls=None, config_path=config_path, websocket=websocket, message_type=message_type, user_id=user_id)
+        researcher = GPTResearcher(query=task, report_type=report_type, source_urls=None, config_path=config_path, websocket=websocket, message_type=message_type, user_id=user_id, job_id=job_id)
         report = await researcher.run(message_type, user_id)
         # measure time
         end_time = datetime.datetime.now()
-        publish_manager.publish_message({"type": "logs", "output": f"\nTotal run time: {end_time - start_time}\n", "message_type": message_type, "user_id": user_id})
+        await websocket.send_json({"type": "logs", "output": f"\nTotal run time: {end_time - start_time}\n"})
         return report
 
     async def handle_researcher(self, message, task, report_type, message_type, user_id):
-        report = await self.run_agent(task, report_type, None, message_type, user_id)
-        if "Error in generate_report:" in report:
-            publish_manager.publish_message({"type": "error", "output": report, "message_type": message_type, "user_id": user_id})
-        else:
-            path = await write_md_to_pdf(report)
-            publish_manager.publish_message({"type": "path", "output": path, "message_type": message_type, "user_id": user_id})
-            
+        # Progress is published in coalesced, sequenced batches instead of one signed message per line
+        stream = ProgressStream(message.message_id, message_type, user_id, publish_manager)
+        try:
+            try:
+                report = await asyncio.wait_for(self.run_agent(task, report_type, stream, message_type, user_id, job_id=message.message_id),
+                                                timeout=self.research_timeout)
+            except asyncio.TimeoutError:
+                stream.send("error", "ERROR : Research timed out.")
+                message.ack()
+                return 'false'
+            if "Error in generate_report:" in report:
+                stream.send("error", report)
+            else:
+                path = await write_md_to_pdf(report)
+                stream.send("path", path)
+        finally:
+            stream.close()
+
         message.ack()
-        return 'true'
\ No newline at end of file
+        return 'true'
+
+    def metrics(self):
+        """Returns the worker usage and per-message wait and processing times."""
+        return {
+            "max_workers": self.max_workers,
+            "max_leased": self.max_workers + self.max_queued,
+            **self.stats.snapshot(),
+        }
@@ -0,0 +1,44 @@
+# Process-wide pooled HTTP client shared by the retrievers
+
+# libraries
+import asyncio
+import os
+import weakref
+import aiohttp
+
+# aiohttp sessions are bound to the event loop they were created on, so one pooled session is kept per loop
+_sessions = weakref.WeakKeyDictionary()
+
+
+def get_http_session():
+    """
+    Gets the pooled HTTP session of the running event loop, creating it on first use.
+    The session keeps connections alive between requests and applies default timeouts.
+    Returns:
+        session: aiohttp.ClientSession
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=int(os.getenv('HTTP_POOL_SIZE', 100)),
+            limit_per_host=int(os.getenv('HTTP_POOL_SIZE_PER_HOST', 20)),
+            keepalive_timeout=float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', 30)),
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=float(os.getenv('HTTP_TIMEOUT', 20)),
+            connect=float(os.getenv('HTTP_CONNECT_TIMEOUT', 5)),
+        )
+        session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        _sessions[loop] = session
+    return session
+
+
+async def close_http_session():
+    """
+    Closes the pooled HTTP session of the running event loop, if any.
+    """
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
@@ -1,6 +1,9 @@
 # libraries
 from __future__ import annotations
+import asyncio
 import json
+import os
+import weakref
 from fastapi import WebSocket
 from langchain.adapters import openai as lc_openai
 from colorama import Fore, Style
@@ -9,6 +12,24 @@ from typing import Optional
 from gpt_researcher.master.prompts import auto_agent_instructions
 from gpt_researcher.utils.google_pub import PublishManager
 
+# Semaphores limiting the concurrent LLM calls of every research running on an event loop
+_limiters = weakref.WeakKeyDictionary()
+
+
+def get_llm_limiter():
+    """
+    Gets the semaphore shared by the LLM calls of the running event loop, sized by LLM_MAX_CONCURRENCY
+    Returns:
+        limiter: asyncio.Semaphore, None when LLM calls are not limited
+    """
+    max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", 0))
+    if max_concurrency <= 0:
+        return None
+    loop = asyncio.get_running_loop()
+    if loop not in _limiters:
+        _limiters[loop] = asyncio.Semaphore(max_concurrency)
+    return _limiters[loop]
+
 
 async def create_chat_completion(
         messages: list,  # type: ignore
@@ -41,10 +62,17 @@ async def create_chat_completion(
         raise ValueError(f"Max tokens cannot be more than 8001, but got {max_tokens}")
 
     # create response
+    limiter = get_llm_limiter()
     for attempt in range(10):  # maximum of 10 attempts
-        response = await send_chat_completion_request(
-            messages, model, temperature, max_tokens, stream, llm_provider, websocket, message_type, user_id
-        )
+        if limiter is None:
+            response = await send_chat_completion_request(
+                messages, model, temperature, max_tokens, stream, llm_provider, websocket, message_type, user_id
+            )
+        else:
+            async with limiter:
+                response = await send_chat_completion_request(
+                    messages, model, temperature, max_tokens, stream, llm_provider, websocket, message_type, user_id
+                )
         return response
 
     logging.error("Failed to get response from OpenAI API")
@@ -58,7 +86,7 @@ async def send_chat_completion_request(
         messages, model, temperature, max_tokens, stream, llm_provider, websocket, message_type=None, user_id=None
 ):
     if not stream:
-        result = lc_openai.ChatCompletion.create(
+        result = await lc_openai.ChatCompletion.acreate(
             model=model,  # Change model here to use different models
             messages=messages,
             temperature=temperature,
@@ -74,7 +102,8 @@ async def stream_response(model, messages, temperature, max_tokens, llm_provider
     paragraph = ""
     response = ""
 
-    for chunk in lc_openai.ChatCompletion.create(
+    # Async streaming, so cancelling the research stops the stream between chunks
+    async for chunk in await lc_openai.ChatCompletion.acreate(
             model=model,
             messages=messages,
             temperature=temperature,
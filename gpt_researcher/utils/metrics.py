@@ -0,0 +1,65 @@
+# Metrics of the research worker pools
+
+import threading
+from collections import deque
+
+
+def summarize(values):
+    """
+    Summarizes durations
+    Args:
+        values: durations in seconds
+
+    Returns:
+        summary: dict with the average and the 95th percentile, None when there are no values
+    """
+    values = sorted(values)
+    if not values:
+        return {"avg": None, "p95": None}
+    return {"avg": sum(values) / len(values), "p95": values[int(len(values) * 0.95)]}
+
+
+class WorkerMetrics:
+    """
+    Outcome counters, running jobs and wait and run times of a worker pool.
+    Updates are locked, so they may come from callback threads as well as from the event loop.
+    """
+    def __init__(self, counters, max_samples=1000):
+        """
+        Args:
+            counters: names of the outcome counters
+            max_samples: wait and run times kept for the summaries
+        """
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(counters, 0)
+        self.running = 0
+        self.wait_times = deque(maxlen=max_samples)
+        self.run_times = deque(maxlen=max_samples)
+
+    def count(self, name):
+        """Increments an outcome counter."""
+        with self.lock:
+            self.counters[name] += 1
+
+    def start(self, wait_time):
+        """Records a job starting after waiting wait_time seconds for a worker."""
+        with self.lock:
+            self.running += 1
+            self.wait_times.append(wait_time)
+
+    def finish(self, run_time):
+        """Records a job finishing after running for run_time seconds."""
+        with self.lock:
+            self.running -= 1
+            self.run_times.append(run_time)
+
+    def snapshot(self):
+        """Returns the running jobs, the counters and the wait and run time summaries."""
+        with self.lock:
+            wait_times, run_times = list(self.wait_times), list(self.run_times)
+            return {
+                "running": self.running,
+                **self.counters,
+                "wait_time": summarize(wait_times),
+                "run_time": summarize(run_times),
+            }
@@ -0,0 +1,94 @@
+# Coalesced progress stream of a research published over Pub/Sub
+
+import asyncio
+import os
+from gpt_researcher.utils.google_pub import PublishManager
+from gpt_researcher.utils.sink import MessageSink
+
+
+class ProgressStream(MessageSink):
+    """
+    Buffers the progress messages of one research and publishes them in batches.
+    Consecutive log, report and preliminary answer deltas are merged into single frames. A batch is published (and JWT-signed once) when
+    it reaches max_bytes, after flush_interval seconds, or right away for any other message type such as "path" or
+    "error". Batches carry a sequence number, so consumers can reassemble them in order.
+    """
+    def __init__(self, job_id, message_type=None, user_id=None, publish_manager=None, max_bytes=None, flush_interval=None):
+        """
+        Initialize the ProgressStream class.
+        Args:
+            job_id: id of the research, e.g. the id of the Pub/Sub message that requested it
+            message_type:
+            user_id:
+            publish_manager: PublishManager used to publish the batches (optional)
+            max_bytes: buffered output size triggering a flush
+            flush_interval: seconds a message may stay buffered
+        """
+        self.job_id = job_id
+        self.message_type = message_type
+        self.user_id = user_id
+        self.publish_manager = publish_manager or PublishManager()
+        self.max_bytes = max_bytes or int(os.environ.get("PUBSUB_PROGRESS_MAX_BYTES", 16 * 1024))
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.environ.get("PUBSUB_PROGRESS_FLUSH_MS", 250)) / 1000
+        self.frames = []
+        self.size = 0
+        self.sequence = 0
+        self.timer = None
+        self.stats = {"messages": 0, "batches": 0}
+
+    async def send_json(self, message):
+        """Buffers a message."""
+        self.send(message.get("type"), message.get("output"))
+
+    def send(self, type, output):
+        """
+        Buffers a message, publishing the batch when a threshold is reached
+        Args:
+            type: message type
+            output: message output
+        """
+        self.stats["messages"] += 1
+        last = self.frames[-1] if self.frames else None
+        if last and type in ("logs", "report", "preliminary") and last["type"] == type and isinstance(output, str) and isinstance(last["output"], str):
+            last["output"] += ("\n" if type == "logs" else "") + output
+        else:
+            self.frames.append({"type": type, "output": output})
+        self.size += len(str(output))
+
+        if type not in ("logs", "report", "preliminary") or self.size >= self.max_bytes:
+            self.flush()
+        elif self.timer is None:
+            try:
+                self.timer = asyncio.get_running_loop().call_later(self.flush_interval, self.flush)
+            except RuntimeError:
+                self.flush()
+
+    def flush(self, last=False):
+        """
+        Publishes the buffered frames as one batch
+        Args:
+            last: marks the final batch of the research
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.frames and not last:
+            return
+        batch = {
+            "type": "progress",
+            "job_id": self.job_id,
+            "sequence": self.sequence,
+            "last": last,
+            "frames": self.frames,
+            "message_type": self.message_type,
+            "user_id": self.user_id,
+        }
+        self.frames = []
+        self.size = 0
+        self.sequence += 1
+        self.stats["batches"] += 1
+        self.publish_manager.publish_message(batch)
+
+    def close(self):
+        """Publishes the remaining frames as the final batch."""
+        self.flush(last=True)
@@ -0,0 +1,16 @@
+# Base class of the progress sinks handed to GPTResearcher in place of a websocket
+
+
+class MessageSink:
+    """
+    Receiver of the progress messages of a research.
+    GPTResearcher and stream_output only call `send_json` on their websocket, so any sink implementing it can be
+    handed to them in place of one, e.g. to batch, store, reorder or drop the messages.
+    """
+    async def send_json(self, message):
+        """
+        Receives a progress message
+        Args:
+            message: dict with the message "type" ("logs", "report", "preliminary", "path", ...) and its "output"
+        """
+        raise NotImplementedError
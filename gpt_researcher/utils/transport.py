@@ -0,0 +1,226 @@
+# Message transports used by PublishManager and SubscribeManager
+
+import itertools
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class PubSubTransport:
+    """
+    Interface of the message transports behind PublishManager and SubscribeManager.
+    Topics and subscriptions are given by name, the transport resolves them to its own paths.
+    """
+    def publish(self, topic, data, ordering_key=""):
+        """
+        Publishes a message without waiting for it to be sent
+        Args:
+            topic: topic name
+            data: message bytes
+            ordering_key: messages sharing a key are delivered in order
+
+        Returns:
+            future: concurrent.futures.Future resolving to the message id
+        """
+        raise NotImplementedError
+
+    def resume_publish(self, topic, ordering_key):
+        """Resumes an ordering key paused by a failed publish."""
+
+    def subscribe(self, subscription, callback, max_messages, max_lease_duration=None):
+        """
+        Starts delivering the messages of a subscription to callback on background threads
+        Args:
+            subscription: subscription name
+            callback: function called with every message, which has data, message_id, ack(), nack() and
+                modify_ack_deadline(seconds)
+            max_messages: messages delivered and not yet acked at most
+            max_lease_duration: seconds the ack deadline of a message may be extended for
+
+        Returns:
+            future: streaming pull future, cancel() stops the delivery
+        """
+        raise NotImplementedError
+
+    def stop(self):
+        """Sends the pending messages and releases the transport."""
+
+
+class InMemoryMessage:
+    """Message delivered by the InMemoryBroker."""
+    def __init__(self, broker, subscription, message_id, data, ordering_key=""):
+        self.broker = broker
+        self.subscription = subscription
+        self.message_id = message_id
+        self.data = data
+        self.ordering_key = ordering_key
+        self.published_at = time.monotonic()
+        self.delivery_attempt = 0
+        self.state = None
+        self.deadline_extensions = 0
+
+    def ack(self):
+        self.broker._settle(self, acked=True)
+
+    def nack(self):
+        self.broker._settle(self, acked=False)
+
+    def modify_ack_deadline(self, seconds):
+        self.deadline_extensions += 1
+
+
+class InMemoryPull:
+    """Streaming pull of an InMemoryBroker subscription."""
+    def __init__(self, broker, subscription):
+        self.broker = broker
+        self.subscription = subscription
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+        self.broker._unsubscribe(self.subscription)
+
+    def result(self, timeout=None):
+        self.cancelled.wait(timeout)
+
+
+class InMemoryBroker(PubSubTransport):
+    """
+    In-process broker standing in for Google Pub/Sub, e.g. for local runs and load tests.
+    A subscription has the name of its topic. Every subscription dispatches its messages in publish order from its own
+    thread to a shared callback pool, holding at most max_messages unacked ones. Nacked messages are redelivered, and
+    messages published while nobody is subscribed, or nacked or left undelivered by a stopped subscriber, are kept
+    until a subscriber comes.
+    """
+    def __init__(self, max_callback_threads=64):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+        self.retained = defaultdict(list)
+        self.callbacks = ThreadPoolExecutor(max_workers=max_callback_threads, thread_name_prefix="in-memory-broker")
+        self.counters = {"published": 0, "delivered": 0, "acked": 0, "nacked": 0}
+        self.ack_latencies = defaultdict(lambda: deque(maxlen=10000))
+
+    def publish(self, topic, data, ordering_key=""):
+        future = Future()
+        # Unique across processes, as message ids key the research checkpoints
+        message = InMemoryMessage(self, topic, uuid.uuid4().hex, data, ordering_key)
+        with self.lock:
+            self.counters["published"] += 1
+            subscription = self.subscriptions.get(topic)
+            if subscription is None:
+                self.retained[topic].append(message)
+            else:
+                subscription["queue"].put(message)
+        future.set_result(message.message_id)
+        return future
+
+    def subscribe(self, subscription, callback, max_messages, max_lease_duration=None):
+        state = {"name": subscription, "callback": callback, "queue": queue.Queue(),
+                 "flow_control": threading.BoundedSemaphore(max_messages)}
+        with self.lock:
+            if subscription in self.subscriptions:
+                raise Exception(f"Subscription {subscription} already has a subscriber.")
+            self.subscriptions[subscription] = state
+            for message in self.retained.pop(subscription, []):
+                state["queue"].put(message)
+        threading.Thread(target=self._dispatch, args=(state,), name=f"in-memory-pull-{subscription}", daemon=True).start()
+        return InMemoryPull(self, subscription)
+
+    def _unsubscribe(self, subscription):
+        with self.lock:
+            state = self.subscriptions.pop(subscription, None)
+        if state is not None:
+            state["queue"].put(None)
+
+    def _dispatch(self, state):
+        while True:
+            message = state["queue"].get()
+            if message is None:
+                return
+            state["flow_control"].acquire()
+            with self.lock:
+                if self.subscriptions.get(state["name"]) is not state:
+                    # Left undelivered by a stopped subscriber
+                    state["flow_control"].release()
+                    self.retained[state["name"]].append(message)
+                    continue
+                message.state = state
+                message.delivery_attempt += 1
+                self.counters["delivered"] += 1
+            self.callbacks.submit(state["callback"], message)
+
+    def _settle(self, message, acked):
+        state = message.state
+        with self.lock:
+            if acked:
+                self.counters["acked"] += 1
+                self.ack_latencies[message.subscription].append(time.monotonic() - message.published_at)
+            else:
+                self.counters["nacked"] += 1
+                if self.subscriptions.get(message.subscription) is not state:
+                    # Nacked by a stopped subscriber
+                    self.retained[message.subscription].append(message)
+                    state = None
+        if state is not None and not acked:
+            state["queue"].put(message)
+        message.state["flow_control"].release()
+
+    def stop(self):
+        for subscription in list(self.subscriptions):
+            self._unsubscribe(subscription)
+        self.callbacks.shutdown(wait=False)
+
+    def stats(self, subscription=None):
+        """
+        Returns the message counts and the publish to ack latency
+        Args:
+            subscription: subscription to report the ack latency of, all of them by default
+        """
+        if subscription is None:
+            latencies = sorted(itertools.chain(*self.ack_latencies.values()))
+        else:
+            latencies = sorted(self.ack_latencies[subscription])
+        return {
+            **self.counters,
+            "ack_latency": {
+                "avg": sum(latencies) / len(latencies) if latencies else None,
+                "p95": latencies[int(len(latencies) * 0.95)] if latencies else None,
+            },
+        }
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """
+    Gets the process-wide transport chosen by PUBSUB_TRANSPORT: "google" (default) or "memory"
+    Returns:
+        transport: PubSubTransport
+    """
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            name = os.environ.get("PUBSUB_TRANSPORT", "google")
+            if name == "memory":
+                _transport = InMemoryBroker()
+            elif name == "google":
+                from gpt_researcher.utils.google_pub import GooglePubSubTransport
+                _transport = GooglePubSubTransport()
+            else:
+                raise Exception(f"Pub/Sub transport {name} not found.")
+        return _transport
+
+
+def close_transport():
+    """Stops the process-wide transport, sending its pending messages."""
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            _transport.stop()
+            _transport = None
@@ -0,0 +1,86 @@
+# URL canonicalization and dedup index for visited urls
+
+# libraries
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "igshid", "ref_src", "_hsenc", "_hsmi"}
+
+
+def canonicalize_url(url):
+    """
+    Canonicalizes a url so that trivially different forms of the same page compare equal.
+    Lowercases the scheme and host, treats http and https alike, drops "www.", default ports, fragments,
+    trailing slashes and tracking parameters (utm_*, gclid, ...) and sorts the remaining query parameters.
+    Args:
+        url: url to canonicalize
+
+    Returns:
+        canonical url: str
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    if parts.scheme not in ("http", "https"):
+        return url
+
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+             if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS]
+    return urlunsplit(("https", host, path, urlencode(sorted(query)), ""))
+
+
+class URLIndex:
+    """
+    Dedup index of the urls visited by a research.
+    Urls are compared in canonical form, and redirect targets reported by the scraper are tracked too,
+    so a page reached through different urls is only fetched once.
+    """
+    def __init__(self):
+        """
+        Initializes the URLIndex object
+        """
+        self.seen = set()
+        self.avoided_fetches = 0
+        self.lock = threading.Lock()
+
+    def __contains__(self, url):
+        return canonicalize_url(url) in self.seen
+
+    def __len__(self):
+        return len(self.seen)
+
+    def add(self, url):
+        """
+        Adds a url to the index
+        Returns:
+            added: False when the url (in canonical form) was already visited
+        """
+        canonical = canonicalize_url(url)
+        with self.lock:
+            if canonical in self.seen:
+                self.avoided_fetches += 1
+                return False
+            self.seen.add(canonical)
+            return True
+
+    def add_redirect(self, url, target):
+        """
+        Records the target a fetched url redirected to
+        Returns:
+            added: False when the target had already been visited, meaning the fetched content is a duplicate
+        """
+        if canonicalize_url(url) == canonicalize_url(target):
+            return True
+        return self.add(target)
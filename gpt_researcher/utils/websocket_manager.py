@@ -1,9 +1,106 @@
 # connect any client to gpt-researcher using websocket
 import asyncio
 import datetime
+import os
+import time
+from collections import deque
 from typing import List, Dict
 from fastapi import WebSocket
 from gpt_researcher.master.agent import GPTResearcher
+from gpt_researcher.utils.sink import MessageSink
+
+
+class WebSocketSender(MessageSink):
+    """
+    Per-connection sender decoupling the research from network I/O.
+    Messages go through a bounded queue and are flushed in batches every flush interval, with consecutive
+    frames of the same type coalesced. When the queue is full, log messages are merged into the last pending
+    log frame or dropped, while report chunks and other messages wait for room and are never dropped.
+    """
+    def __init__(self, websocket: WebSocket, max_queue: int = 256, flush_interval: float = 0.05):
+        """Initialize the WebSocketSender class."""
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self.pending = deque()
+        self.condition = asyncio.Condition()
+        self.closed = False
+        self.stats = {"messages": 0, "frames": 0, "merged": 0, "dropped": 0, "max_lag": 0.0, "total_lag": 0.0}
+
+    async def send_json(self, message: dict):
+        """Queue a message for the connection."""
+        if self.closed:
+            return
+        async with self.condition:
+            self.stats["messages"] += 1
+            if message.get("type") == "logs" and len(self.pending) >= self.max_queue:
+                # Under backpressure, merge into the last pending log frame, or drop the message
+                last = self.pending[-1][1]
+                if last.get("type") == "logs" and isinstance(last.get("output"), str) and isinstance(message.get("output"), str):
+                    last["output"] += "\n" + message["output"]
+                    self.stats["merged"] += 1
+                else:
+                    self.stats["dropped"] += 1
+                return
+            await self.condition.wait_for(lambda: len(self.pending) < self.max_queue or self.closed)
+            if self.closed:
+                return
+            self.pending.append((time.monotonic(), dict(message)))
+            self.condition.notify_all()
+
+    def coalesce(self, batch):
+        """Merge consecutive log, report or preliminary answer frames of a batch into single frames, keeping their order."""
+        frames = []
+        for enqueued_at, message in batch:
+            if frames:
+                last_enqueued_at, last = frames[-1]
+                if (message.get("type") in ("logs", "report", "preliminary") and message.get("type") == last.get("type")
+                        and isinstance(last.get("output"), str) and isinstance(message.get("output"), str)):
+                    separator = "\n" if message["type"] == "logs" else ""
+                    last["output"] += separator + message["output"]
+                    continue
+            frames.append((enqueued_at, message))
+        return frames
+
+    async def run(self):
+        """Send the queued messages until the connection is closed."""
+        while True:
+            async with self.condition:
+                await self.condition.wait_for(lambda: self.pending or self.closed)
+                if self.closed and not self.pending:
+                    return
+            # Let a batch accumulate before flushing it
+            await asyncio.sleep(self.flush_interval)
+            async with self.condition:
+                batch = list(self.pending)
+                self.pending.clear()
+                self.condition.notify_all()
+            try:
+                for enqueued_at, frame in self.coalesce(batch):
+                    await self.websocket.send_json(frame)
+                    lag = time.monotonic() - enqueued_at
+                    self.stats["frames"] += 1
+                    self.stats["total_lag"] += lag
+                    self.stats["max_lag"] = max(self.stats["max_lag"], lag)
+            except Exception:
+                await self.close()
+                return
+
+    async def close(self):
+        """Stop accepting messages and release the producers waiting for room."""
+        async with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def metrics(self):
+        """Per-connection queue depth and lag metrics."""
+        oldest = self.pending[0][0] if self.pending else None
+        return {
+            "queue_depth": len(self.pending),
+            "current_lag": time.monotonic() - oldest if oldest else 0.0,
+            "avg_lag": self.stats["total_lag"] / self.stats["frames"] if self.stats["frames"] else 0.0,
+            **self.stats,
+        }
 
 
 class WebSocketManager:
@@ -12,54 +109,50 @@ class WebSocketManager:
         """Initialize the WebSocketManager class."""
         self.active_connections: List[WebSocket] = []
         self.sender_tasks: Dict[WebSocket, asyncio.Task] = {}
-        self.message_queues: Dict[WebSocket, asyncio.Queue] = {}
-
-    async def start_sender(self, websocket: WebSocket):
-        """Start the sender task."""
-        queue = self.message_queues.get(websocket)
-        if not queue:
-            return
-
-        while True:
-            message = await queue.get()
-            if websocket in self.active_connections:
-                try:
-                    await websocket.send_text(message)
-                except:
-                    break
-            else:
-                break
+        self.senders: Dict[WebSocket, WebSocketSender] = {}
 
     async def connect(self, websocket: WebSocket):
         """Connect a websocket."""
         await websocket.accept()
         self.active_connections.append(websocket)
-        self.message_queues[websocket] = asyncio.Queue()
-        self.sender_tasks[websocket] = asyncio.create_task(self.start_sender(websocket))
+        self.senders[websocket] = WebSocketSender(websocket,
+                                                  max_queue=int(os.getenv("WS_SEND_QUEUE", 256)),
+                                                  flush_interval=float(os.getenv("WS_FLUSH_INTERVAL_MS", 50)) / 1000)
+        self.sender_tasks[websocket] = asyncio.create_task(self.senders[websocket].run())
 
     async def disconnect(self, websocket: WebSocket):
         """Disconnect a websocket."""
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+            await self.senders[websocket].close()
             self.sender_tasks[websocket].cancel()
-            await self.message_queues[websocket].put(None)
             del self.sender_tasks[websocket]
-            del self.message_queues[websocket]
+            del self.senders[websocket]
+
+    async def send_json(self, websocket: WebSocket, message: dict):
+        """Queue a message on the sender of a websocket."""
+        sender = self.senders.get(websocket)
+        if sender:
+            await sender.send_json(message)
 
     async def start_streaming(self, task, report_type, websocket):
         """Start streaming the output."""
-        report = await run_agent(task, report_type, websocket)
+        report = await run_agent(task, report_type, self.senders[websocket])
         return report
 
+    def metrics(self):
+        """Sender metrics of every connection."""
+        return [sender.metrics() for sender in self.senders.values()]
+
 
-async def run_agent(task, report_type, websocket):
-    """Run the agent."""
+async def run_agent(task, report_type, websocket, job_id=None):
+    """Run the agent, resuming the checkpointed stages of job_id if given."""
     # measure time
     start_time = datetime.datetime.now()
     # add customized JSON config file path here
     config_path = None
     # run agent
-    researcher = GPTResearcher(query=task, report_type=report_type, source_urls=None, config_path=config_path, websocket=websocket)
+    researcher = GPTResearcher(query=task, report_type=report_type, source_urls=None, config_path=config_path, websocket=websocket, job_id=job_id)
     report = await researcher.run()
     # measure time
     end_time = datetime.datetime.now()
@@ -1,8 +1,11 @@
 from backend.server import app
 from dotenv import load_dotenv
+import os
 load_dotenv()
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Several workers share the job store and outputs, so any of them can run a job or serve its progress
+    workers = int(os.getenv("WEB_CONCURRENCY", 1))
+    uvicorn.run("backend.server:app" if workers > 1 else app, host="0.0.0.0", port=8000, workers=workers)
\ No newline at end of file